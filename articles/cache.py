@@ -0,0 +1,213 @@
+import gzip
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from blog import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+VERSION_KEY = "articles:version"
+# Preferred first; smaller payloads are not worth compressing.
+ENCODINGS = ("br", "gzip")
+MIN_COMPRESS_SIZE = 200
+
+
+def get_cache():
+    return caches[getattr(settings, "ARTICLES_CACHE_ALIAS", "default")]
+
+
+def get_version():
+    """Current version of the article table, bumped on every write."""
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock so an evicted counter never reuses old keys.
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    cache = get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def response_key(request):
+    digest = hashlib.sha1(
+        "|".join(
+            (request.get_host(), request.get_full_path(), request.accepted_media_type)
+        ).encode()
+    ).hexdigest()
+    return f"articles:response:{get_version()}:{digest}"
+
+
+def acquire(key):
+    """Take the recompute lock for ``key``; only one miss recomputes."""
+    return get_cache().add(
+        f"{key}:lock", 1, getattr(settings, "ARTICLES_CACHE_LOCK_TIMEOUT", 10)
+    )
+
+
+def release(key):
+    get_cache().delete(f"{key}:lock")
+
+
+def wait_for(key):
+    """Poll, backing off, for a payload another request is computing.
+
+    Gives up after ``ARTICLES_CACHE_WAIT`` seconds, after which the caller
+    computes the response itself.
+    """
+    cache = get_cache()
+    deadline = time.monotonic() + getattr(settings, "ARTICLES_CACHE_WAIT", 0.5)
+    delay = 0.01
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            metrics.incr("articles.cache.wait_timeouts")
+            return None
+        time.sleep(min(delay, remaining))
+        delay = min(2 * delay, 0.1)
+        payload = cache.get(key)
+        if payload is not None:
+            return payload
+
+
+def compress(content):
+    """Compressed variants of ``content`` by encoding, built once per version."""
+    if len(content) < MIN_COMPRESS_SIZE:
+        return {}
+    variants = {
+        "gzip": gzip.compress(
+            content,
+            compresslevel=getattr(settings, "ARTICLES_CACHE_GZIP_LEVEL", 9),
+            mtime=0,
+        )
+    }
+    if brotli is not None:
+        variants["br"] = brotli.compress(
+            content, quality=getattr(settings, "ARTICLES_CACHE_BROTLI_QUALITY", 9)
+        )
+    return {
+        encoding: data
+        for encoding, data in variants.items()
+        if len(data) < len(content)
+    }
+
+
+def accepted_encoding(request, available):
+    """The preferred of the ``available`` encodings the client accepts."""
+    weights = {}
+    for part in request.META.get("HTTP_ACCEPT_ENCODING", "").split(","):
+        coding, _, params = part.partition(";")
+        weight = 1.0
+        name, _, value = params.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if encoding in available and weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def encode(response, payload, request):
+    """Send the stored variant of ``payload`` the client prefers."""
+    encodings = payload.get("encodings", {})
+    encoding = accepted_encoding(request, encodings)
+    if encoding is not None:
+        response.content = encodings[encoding]
+        response["Content-Encoding"] = encoding
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def store(key, response, locked):
+    try:
+        payload = {
+            "content": response.content,
+            "content_type": response["Content-Type"],
+            "encodings": compress(response.content),
+        }
+        get_cache().set(key, payload, getattr(settings, "ARTICLES_CACHE_TIMEOUT", 60))
+    finally:
+        if locked:
+            release(key)
+    return payload
+
+
+class CachedResponseMixin:
+    """Serve anonymous list/retrieve responses from the cache.
+
+    Rendered JSON is stored under a key derived from the request URL and
+    the article table version, so any article write invalidates it. Gzip
+    and brotli variants are compressed once when the entry is stored and
+    picked by ``Accept-Encoding``.
+    """
+
+    cached_actions = ("list", "retrieve")
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
+
+    def is_cacheable(self):
+        return (
+            self.action in self.cached_actions
+            and self.request.method == "GET"
+            and not self.request.user.is_authenticated
+            and self.request.accepted_renderer.format == "json"
+            and getattr(settings, "ARTICLES_CACHE_TIMEOUT", 60) > 0
+        )
+
+    def cached_response(self, handler, *args, **kwargs):
+        if not self.is_cacheable():
+            return handler(*args, **kwargs)
+
+        key = response_key(self.request)
+        payload = get_cache().get(key)
+        locked = False
+        if payload is None:
+            locked = acquire(key)
+            if not locked:
+                payload = wait_for(key)
+        if payload is not None:
+            return encode(
+                HttpResponse(payload["content"], content_type=payload["content_type"]),
+                payload,
+                self.request,
+            )
+
+        try:
+            response = handler(*args, **kwargs)
+        except Exception:
+            if locked:
+                release(key)
+            raise
+        if response.status_code == 200:
+            response.add_post_render_callback(
+                lambda rendered: encode(
+                    rendered, store(key, rendered, locked), self.request
+                )
+            )
+        elif locked:
+            release(key)
+        return response
@@ -0,0 +1,279 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from articles import ranking
+from articles.models import Article, AuthorAffinity, FeedEntry, UnreadCounter
+from users.models import Profile, SubscriptionUser
+
+HOT_AUTHORS_CACHE_KEY = "feed:hot_authors"
+
+
+def fanout_limit():
+    return getattr(settings, "FEED_FANOUT_MAX_SUBSCRIBERS", 10000)
+
+
+def hot_author_ids():
+    """Authors with too many subscribers to fan out on write.
+
+    Their articles are pulled at read time instead of being copied into
+    every subscriber's feed. Read from the profiles' follower counters.
+    """
+    ids = cache.get(HOT_AUTHORS_CACHE_KEY)
+    if ids is None:
+        ids = set(
+            Profile.objects.filter(num_followers__gt=fanout_limit()).values_list(
+                "user_id", flat=True
+            )
+        )
+        cache.set(
+            HOT_AUTHORS_CACHE_KEY,
+            ids,
+            getattr(settings, "FEED_HOT_AUTHORS_TIMEOUT", 60),
+        )
+    return ids
+
+
+def is_hot_author(author_id):
+    return author_id in hot_author_ids()
+
+
+def fan_out_article(article):
+    """Push a new article into the feeds of its author's subscribers."""
+    fan_out_articles([article])
+
+
+def fan_out_articles(articles):
+    """Push new articles into the feeds of their authors' subscribers."""
+    hot_ids = hot_author_ids()
+    by_author = {}
+    for article in articles:
+        if article.user_id is not None and article.user_id not in hot_ids:
+            by_author.setdefault(article.user_id, []).append(article)
+    if not by_author:
+        return
+    subscriptions = SubscriptionUser.objects.filter(
+        user_id__in=by_author
+    ).values_list("user_id", "subscriber_id")
+    affinity = ranking.affinities(author_id__in=by_author)
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                subscriber_id=subscriber_id,
+                article_id=article.id,
+                author_id=author_id,
+                created=article.created,
+                score=ranking.score(
+                    article.created,
+                    affinity.get((subscriber_id, author_id), 0),
+                    article.num_reads,
+                ),
+            )
+            for author_id, subscriber_id in subscriptions.iterator()
+            for article in by_author[author_id]
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_subscription(subscription):
+    """Copy the latest articles of a newly followed author into the feed."""
+    if is_hot_author(subscription.user_id):
+        return
+    articles = (
+        Article.objects.filter(user_id=subscription.user_id)
+        .order_by("-created", "-id")
+        .values_list("id", "created", "num_reads")[
+            : getattr(settings, "FEED_BACKFILL_LIMIT", 500)
+        ]
+    )
+    affinity = ranking.affinities(
+        user_id=subscription.subscriber_id, author_id=subscription.user_id
+    ).get((subscription.subscriber_id, subscription.user_id), 0)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                subscriber_id=subscription.subscriber_id,
+                article_id=article_id,
+                author_id=subscription.user_id,
+                created=created,
+                score=ranking.score(created, affinity, num_reads),
+            )
+            for article_id, created, num_reads in articles
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def backfill_subscriptions(subscriber_id, author_ids):
+    """``backfill_subscription`` for many newly followed authors at once.
+
+    The latest articles of every author are picked with one window query.
+    """
+    hot_ids = hot_author_ids()
+    author_ids = [author_id for author_id in author_ids if author_id not in hot_ids]
+    if not author_ids:
+        return
+    placeholders = ", ".join(["%s"] * len(author_ids))
+    articles = Article.objects.raw(
+        f"""
+        SELECT ranked.id, ranked.user_id, created, num_reads,
+            COALESCE(affinity.reads, 0) AS affinity FROM (
+            SELECT id, user_id, created, num_reads, ROW_NUMBER() OVER (
+                PARTITION BY user_id ORDER BY created DESC, id DESC
+            ) AS recency
+            FROM {Article._meta.db_table} WHERE user_id IN ({placeholders})
+        ) ranked
+        LEFT JOIN {AuthorAffinity._meta.db_table} affinity
+            ON affinity.user_id = %s AND affinity.author_id = ranked.user_id
+        WHERE recency <= %s
+        """,
+        [*author_ids, subscriber_id, getattr(settings, "FEED_BACKFILL_LIMIT", 500)],
+    )
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(
+                subscriber_id=subscriber_id,
+                article_id=article.id,
+                author_id=article.user_id,
+                created=article.created,
+                score=ranking.score(
+                    article.created, article.affinity, article.num_reads
+                ),
+            )
+            for article in articles
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def cooled_authors(author_ids):
+    """Of ``author_ids`` that just lost followers, those no longer hot.
+
+    An author drops to the fan-out limit only from one follower above it.
+    """
+    return list(
+        Profile.objects.filter(
+            user_id__in=author_ids, num_followers=fanout_limit()
+        ).values_list("user_id", flat=True)
+    )
+
+
+def backfill_authors(author_ids):
+    """Deliver the latest articles of authors who stopped being hot.
+
+    Articles published while an author was hot were never fanned out, so
+    their subscribers get them like a new subscription would. Unread
+    counters of those subscribers are dropped to be recounted.
+    """
+    cache.delete(HOT_AUTHORS_CACHE_KEY)
+    for author_id in author_ids:
+        articles = list(
+            Article.objects.filter(user_id=author_id)
+            .order_by("-created", "-id")
+            .values_list("id", "created", "num_reads")[
+                : getattr(settings, "FEED_BACKFILL_LIMIT", 500)
+            ]
+        )
+        affinity = ranking.affinities(author_id=author_id)
+        subscribers = SubscriptionUser.objects.filter(user_id=author_id).values_list(
+            "subscriber_id", flat=True
+        )
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(
+                    subscriber_id=subscriber_id,
+                    article_id=article_id,
+                    author_id=author_id,
+                    created=created,
+                    score=ranking.score(
+                        created, affinity.get((subscriber_id, author_id), 0), num_reads
+                    ),
+                )
+                for subscriber_id in subscribers.iterator()
+                for article_id, created, num_reads in articles
+            ),
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+        UnreadCounter.objects.filter(user_id__in=subscribers).delete()
+
+
+def prune_subscription(subscription):
+    """Drop an unfollowed author's articles from the subscriber's feed."""
+    FeedEntry.objects.filter(
+        subscriber_id=subscription.subscriber_id, author_id=subscription.user_id
+    ).delete()
+
+
+def prune_subscriptions(subscriber_id, author_ids):
+    FeedEntry.objects.filter(
+        subscriber_id=subscriber_id, author_id__in=author_ids
+    ).delete()
+
+
+def followed_hot_authors(user):
+    hot_ids = hot_author_ids()
+    if not hot_ids:
+        return []
+    return list(
+        SubscriptionUser.objects.filter(
+            subscriber_id=user.id, user_id__in=hot_ids
+        ).values_list("user_id", flat=True)
+    )
+
+
+def feed_queryset(user):
+    """Articles in the user's feed.
+
+    Materialized entries are joined in and their own ``created`` and
+    ``article`` columns are the pagination keyset, so a page is one range
+    scan of the (subscriber, -created, -article) index. Followed hot
+    authors are merged in with a pull on their articles, which needs a
+    sort.
+    """
+    hot_ids = followed_hot_authors(user)
+    if not hot_ids:
+        return Article.objects.filter(feed_entries__subscriber_id=user.id).annotate(
+            keyset_created=F("feed_entries__created"),
+            keyset_pk=F("feed_entries__article_id"),
+        )
+    return Article.objects.filter(
+        Q(id__in=FeedEntry.objects.filter(subscriber_id=user.id).values("article_id"))
+        | Q(user_id__in=hot_ids)
+    )
+
+
+def ranked_feed_queryset(user):
+    """Articles in the user's feed annotated with their ``score``.
+
+    Materialized entries are served with their precomputed score from the
+    (subscriber, score) index. Articles of followed hot authors, which
+    have no entries, are merged in and scored the same way in SQL.
+    """
+    hot_ids = followed_hot_authors(user)
+    if not hot_ids:
+        return Article.objects.filter(feed_entries__subscriber_id=user.id).annotate(
+            score=F("feed_entries__score")
+        )
+    entries = FeedEntry.objects.filter(subscriber_id=user.id)
+    affinity = ranking.affinities(user_id=user.id, author_id__in=hot_ids)
+    return Article.objects.filter(
+        Q(id__in=entries.values("article_id")) | Q(user_id__in=hot_ids)
+    ).annotate(
+        score=Coalesce(
+            Subquery(entries.filter(article_id=OuterRef("pk")).values("score")[:1]),
+            ranking.score_expression(
+                {
+                    author_id: ranking.affinity_term(
+                        affinity.get((user.id, author_id), 0)
+                    )
+                    for author_id in hot_ids
+                }
+            ),
+        )
+    )
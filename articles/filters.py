@@ -0,0 +1,56 @@
+from django.db.models import Exists, OuterRef
+from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter
+
+from articles.models import Article, ReadArticle
+from articles.search import search
+
+
+class ArticleFilter(filters.FilterSet):
+    """Search and filters for article lists and feeds.
+
+    ``created_after``/``created_before`` and ``updated_after``/
+    ``updated_before`` take ISO 8601 datetimes.
+    """
+
+    q = filters.CharFilter(method="filter_search", label="Search")
+    author = filters.NumberFilter(field_name="user")
+    created = filters.IsoDateTimeFromToRangeFilter()
+    updated = filters.IsoDateTimeFromToRangeFilter()
+    is_read = filters.BooleanFilter(method="filter_is_read")
+
+    class Meta:
+        model = Article
+        fields = ["q", "author", "created", "updated", "is_read"]
+
+    def filter_search(self, queryset, name, value):
+        return search(queryset, value)
+
+    def filter_is_read(self, queryset, name, value):
+        user = getattr(self.request, "user", None)
+        if user is None or not user.is_authenticated:
+            return queryset if not value else queryset.none()
+        read = Exists(
+            ReadArticle.objects.filter(
+                user_id=user.id, article=OuterRef("pk"), is_read=True
+            )
+        )
+        return queryset.filter(read if value else ~read)
+
+
+class ArticleOrderingFilter(OrderingFilter):
+    """Ordering that accepts ``rank`` only when a search annotated it.
+
+    Likewise ``score``, which only the ranked feed annotates.
+    """
+
+    annotated_fields = ("rank", "score")
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        fields = super().remove_invalid_fields(queryset, fields, view, request)
+        return [
+            term
+            for term in fields
+            if term.lstrip("-") not in self.annotated_fields
+            or term.lstrip("-") in queryset.query.annotations
+        ]
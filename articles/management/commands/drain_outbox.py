@@ -0,0 +1,67 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from articles import outbox
+
+
+class Command(BaseCommand):
+    help = "Do the feed and unread count work queued in the outbox by writes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1)
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Run the workers in forked processes instead of threads.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Events claimed per transaction; defaults to OUTBOX_BATCH_SIZE.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when the outbox is empty."
+        )
+
+    def handle(
+        self, *args, workers, processes, batch_size, poll_interval, once, **options
+    ):
+        if workers > 1 and not connection.features.has_select_for_update_skip_locked:
+            raise CommandError(
+                f"{connection.vendor} cannot skip rows claimed by another worker; "
+                "run a single worker."
+            )
+        if processes:
+            # Children must not share the parent's database sockets.
+            connections.close_all()
+            executor = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("fork")
+            )
+            stop = None
+        else:
+            executor = ThreadPoolExecutor(workers, thread_name_prefix="outbox")
+            stop = threading.Event()
+        with executor:
+            futures = [
+                executor.submit(outbox.work, batch_size, poll_interval, once, stop)
+                for _ in range(workers)
+            ]
+            try:
+                claimed = sum(future.result() for future in futures)
+            except KeyboardInterrupt:
+                if stop is None:
+                    raise
+                # Let the threads finish and commit their current batch.
+                stop.set()
+                claimed = sum(future.result() for future in futures)
+        self.stdout.write(f"handled {claimed} events")
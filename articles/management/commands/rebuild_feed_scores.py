@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles import ranking
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount article reads and author affinities and recompute the ranked "
+        "feed scores in chunks, e.g. after changing the FEED_RANK_* settings."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=100)
+        parser.add_argument(
+            "--reads-only",
+            action="store_true",
+            help="Only recount article reads, moving the scores they change; "
+            "run it periodically to keep popularity current.",
+        )
+
+    def handle(self, *args, chunk_size, reads_only, **options):
+        articles = self.rebuild_chunks(
+            Article.objects, ranking.recount_reads, chunk_size * 100
+        )
+        if reads_only:
+            self.stdout.write(f"recounted {articles} articles")
+            return
+        users = self.rebuild_chunks(User.objects, self.rebuild_users, chunk_size)
+        self.stdout.write(f"recounted {articles} articles, rescored {users} feeds")
+
+    def rebuild_users(self, users):
+        user_ids = list(users.values_list("id", flat=True))
+        ranking.rebuild_affinities(user_ids)
+        ranking.rescore(user_ids)
+
+    def rebuild_chunks(self, manager, rebuild, chunk_size):
+        done = 0
+        last_id = 0
+        while True:
+            ids = list(
+                manager.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not ids:
+                return done
+            last_id = ids[-1]
+            with transaction.atomic():
+                rebuild(manager.filter(id__in=ids))
+            done += len(ids)
@@ -0,0 +1,215 @@
+import io
+import itertools
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from articles import cache as article_cache
+from articles.feed import HOT_AUTHORS_CACHE_KEY, fanout_limit
+from articles.models import (Article, FeedEntry, ReadArticle, UnreadCounter,
+                             summarize)
+from users.models import Profile, SubscriptionUser
+
+WORDS = (
+    "django python postgres index query cache feed article author reader "
+    "latency throughput cursor page token replica queue batch vector search "
+    "stream signal model view router schema json scale shard lock commit"
+).split()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large dataset with bulk_create: users, a skewed follower "
+        "graph, articles, feeds and read receipts. Signals do not run, so "
+        "feeds and counters are derived at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--articles", type=int, default=100000)
+        parser.add_argument(
+            "--follows", type=int, default=50, help="Mean authors followed per user."
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=1.1,
+            help="Zipf exponent of author popularity and activity.",
+        )
+        parser.add_argument(
+            "--read-fraction",
+            type=float,
+            default=0.3,
+            help="Share of feed entries with a read receipt.",
+        )
+        parser.add_argument("--days", type=int, default=365)
+        parser.add_argument("--prefix", default="seed")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.prefix = f"{options['prefix']}_"
+
+        user_ids = self.create_users(options["users"], options["prefix"])
+        # Popular authors are followed and write more, by a Zipf law.
+        authors = user_ids[:]
+        self.random.shuffle(authors)
+        weights = itertools.accumulate(
+            1 / (rank + 1) ** options["skew"] for rank in range(len(authors))
+        )
+        self.authors, self.cum_weights = authors, list(weights)
+
+        self.create_subscriptions(user_ids, options["follows"])
+        self.create_articles(options["articles"], options["days"])
+        self.create_feeds()
+        self.create_receipts(options["read_fraction"])
+
+        UnreadCounter.objects.filter(user__username__startswith=self.prefix).delete()
+        # Every seeded profile starts at zero, so skip the per-user drift report.
+        call_command("rebuild_counters", stdout=io.StringIO())
+        call_command("rebuild_feed_scores", stdout=io.StringIO())
+        cache.delete(HOT_AUTHORS_CACHE_KEY)
+        article_cache.bump_version()
+
+    def pick_authors(self, count):
+        return self.random.choices(self.authors, cum_weights=self.cum_weights, k=count)
+
+    def create_users(self, count, prefix):
+        password = make_password(prefix)
+        users = (
+            User(
+                username=f"{self.prefix}{index}",
+                email=f"{self.prefix}{index}@example.com",
+                password=password,
+            )
+            for index in range(count)
+        )
+        for chunk in chunked(users, self.batch_size):
+            User.objects.bulk_create(chunk, ignore_conflicts=True)
+        user_ids = list(
+            User.objects.filter(username__startswith=self.prefix)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        # Every listed user has a profile; rebuild_counters fills them in.
+        for chunk in chunked(user_ids, self.batch_size):
+            Profile.objects.bulk_create(
+                [Profile(user_id=user_id) for user_id in chunk], ignore_conflicts=True
+            )
+        self.stdout.write(f"users: {len(user_ids)} (password {prefix!r})")
+        return user_ids
+
+    def create_subscriptions(self, user_ids, follows):
+        def subscriptions():
+            for subscriber_id in user_ids:
+                count = min(
+                    len(user_ids), int(self.random.expovariate(1 / follows)) + 1
+                )
+                for author_id in set(self.pick_authors(count)) - {subscriber_id}:
+                    yield SubscriptionUser(
+                        user_id=author_id, subscriber_id=subscriber_id
+                    )
+
+        total = 0
+        for chunk in chunked(subscriptions(), self.batch_size):
+            SubscriptionUser.objects.bulk_create(chunk, ignore_conflicts=True)
+            total += len(chunk)
+        self.stdout.write(f"subscriptions: {total}")
+
+    def create_articles(self, count, days):
+        now = timezone.now()
+
+        def articles():
+            for author_id in self.pick_authors(count):
+                created = now - timedelta(seconds=self.random.randrange(days * 86400))
+                title = " ".join(self.random.choices(WORDS, k=6)).capitalize()
+                body = " ".join(
+                    self.random.choices(WORDS, k=self.random.randint(20, 200))
+                )
+                article = Article(
+                    user_id=author_id, title=title, body=body, summary=summarize(body)
+                )
+                yield article, created
+
+        total = 0
+        for chunk in chunked(articles(), self.batch_size):
+            Article.objects.bulk_create([article for article, _ in chunk])
+            # bulk_create stamps auto_now(_add) fields, bulk_update does not.
+            for article, created in chunk:
+                article.created = article.updated = created
+            Article.objects.bulk_update(
+                [article for article, _ in chunk], ["created", "updated"]
+            )
+            total += len(chunk)
+            self.stdout.write(f"articles: {total}/{count}", ending="\r")
+        self.stdout.write(f"articles: {total}")
+
+    def create_feeds(self):
+        """Fan each author's latest articles out like a new subscription would."""
+        limit = getattr(settings, "FEED_BACKFILL_LIMIT", 500)
+        subscribers = {}
+        for author_id, subscriber_id in SubscriptionUser.objects.filter(
+            user__username__startswith=self.prefix
+        ).values_list("user_id", "subscriber_id"):
+            subscribers.setdefault(author_id, []).append(subscriber_id)
+
+        def entries():
+            for author_id, subscriber_ids in subscribers.items():
+                if len(subscriber_ids) > fanout_limit():
+                    continue
+                articles = list(
+                    Article.objects.filter(user_id=author_id)
+                    .order_by("-created", "-id")
+                    .values_list("id", "created")[:limit]
+                )
+                for subscriber_id in subscriber_ids:
+                    for article_id, created in articles:
+                        yield FeedEntry(
+                            subscriber_id=subscriber_id,
+                            article_id=article_id,
+                            author_id=author_id,
+                            created=created,
+                        )
+
+        total = 0
+        for chunk in chunked(entries(), self.batch_size):
+            FeedEntry.objects.bulk_create(chunk, ignore_conflicts=True)
+            total += len(chunk)
+        self.stdout.write(f"feed entries: {total}")
+
+    def create_receipts(self, fraction):
+        def receipts():
+            entries = FeedEntry.objects.filter(
+                subscriber__username__startswith=self.prefix
+            ).values_list("subscriber_id", "article_id")
+            for subscriber_id, article_id in entries.iterator(
+                chunk_size=self.batch_size
+            ):
+                if self.random.random() < fraction:
+                    yield ReadArticle(
+                        user_id=subscriber_id, article_id=article_id, is_read=True
+                    )
+
+        total = 0
+        for chunk in chunked(receipts(), self.batch_size):
+            ReadArticle.objects.bulk_create(chunk, ignore_conflicts=True)
+            total += len(chunk)
+        self.stdout.write(f"read receipts: {total}")
@@ -0,0 +1,98 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_feeds(apps, schema_editor):
+    Article = apps.get_model("articles", "Article")
+    FeedEntry = apps.get_model("articles", "FeedEntry")
+    SubscriptionUser = apps.get_model("users", "SubscriptionUser")
+    for subscription in SubscriptionUser.objects.iterator():
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    subscriber_id=subscription.subscriber_id,
+                    article_id=article_id,
+                    author_id=subscription.user_id,
+                    created=created,
+                )
+                for article_id, created in Article.objects.filter(
+                    user_id=subscription.user_id
+                ).values_list("id", "created")
+            ],
+            batch_size=1000,
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("articles", "0001_initial"),
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created", models.DateTimeField()),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="articles.article",
+                    ),
+                ),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "subscriber",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["subscriber", "-created", "-article"],
+                name="feedentry_subscriber_created",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["subscriber", "author"], name="feedentry_author"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("subscriber", "article"), name="unique feed entry"
+            ),
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
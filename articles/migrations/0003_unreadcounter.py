@@ -0,0 +1,37 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:45
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("articles", "0002_feedentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UnreadCounter",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="unread_counter",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("unread", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="readarticle",
+            index=models.Index(
+                fields=["user", "article", "is_read"], name="readarticle_user_article"
+            ),
+        ),
+    ]
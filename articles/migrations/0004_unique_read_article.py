@@ -0,0 +1,35 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:46
+
+from django.db import migrations, models
+
+
+def merge_duplicate_receipts(apps, schema_editor):
+    ReadArticle = apps.get_model("articles", "ReadArticle")
+    duplicates = (
+        ReadArticle.objects.values("user", "article")
+        .annotate(num=models.Count("id"), keep=models.Max("id"))
+        .filter(num__gt=1)
+    )
+    for duplicate in duplicates.iterator():
+        receipts = ReadArticle.objects.filter(
+            user_id=duplicate["user"], article_id=duplicate["article"]
+        )
+        is_read = receipts.filter(is_read=True).exists()
+        receipts.exclude(id=duplicate["keep"]).delete()
+        receipts.update(is_read=is_read)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0003_unreadcounter"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_receipts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="readarticle",
+            constraint=models.UniqueConstraint(
+                fields=("user", "article"), name="unique read article"
+            ),
+        ),
+    ]
@@ -0,0 +1,135 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:50
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# The search setup as of this migration; later code changes must not
+# alter what it installs.
+SEARCH_CONFIG = "english"
+FTS_TABLE = "articles_article_fts"
+
+POSTGRES_INSTALL = [
+    f"""
+    CREATE OR REPLACE FUNCTION articles_article_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(NEW.body, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    DROP TRIGGER IF EXISTS articles_article_search_vector_update ON articles_article
+    """,
+    """
+    CREATE TRIGGER articles_article_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, body ON articles_article
+    FOR EACH ROW EXECUTE FUNCTION articles_article_search_vector()
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS articles_article_search_idx
+    ON articles_article USING gin (search_vector)
+    """,
+]
+POSTGRES_UNINSTALL = [
+    "DROP INDEX IF EXISTS articles_article_search_idx",
+    "DROP TRIGGER IF EXISTS articles_article_search_vector_update ON articles_article",
+    "DROP FUNCTION IF EXISTS articles_article_search_vector()",
+]
+
+SQLITE_INSTALL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, body, content='articles_article', content_rowid='id'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF title, body ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_UNINSTALL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def install(schema_editor):
+    """Create the search index and the triggers that keep it current.
+
+    Triggers cover ``bulk_create`` and raw writes as well as ``save``.
+    SQLite drops triggers when a migration rebuilds the article table,
+    so migrations that alter the table restore them.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        for sql in POSTGRES_INSTALL:
+            schema_editor.execute(sql)
+        schema_editor.execute(
+            "UPDATE articles_article SET title = title WHERE search_vector IS NULL"
+        )
+    elif vendor == "sqlite":
+        for sql in SQLITE_INSTALL:
+            schema_editor.execute(sql)
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def uninstall(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        statements = POSTGRES_UNINSTALL
+    elif vendor == "sqlite":
+        statements = SQLITE_UNINSTALL
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def install_search(apps, schema_editor):
+    install(schema_editor)
+
+
+def uninstall_search(apps, schema_editor):
+    uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0004_unique_read_article"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(install_search, uninstall_search),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0005_article_search"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(fields=["-created", "-id"], name="article_created"),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["user", "-created", "-id"], name="article_user_created"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="readarticle",
+            index=models.Index(
+                condition=models.Q(("is_read", True)),
+                fields=["user", "article"],
+                name="readarticle_read",
+            ),
+        ),
+        # Superseded by the unique constraint and readarticle_read.
+        migrations.RemoveIndex(
+            model_name="readarticle",
+            name="readarticle_user_article",
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:31
+
+from django.db import migrations, models
+
+SUMMARY_LENGTH = 200
+FTS_TABLE = "articles_article_fts"
+
+# The search triggers of 0005_article_search.
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF title, body ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+
+def install_search(apps, schema_editor):
+    # SQLite rebuilds the table to add the column, dropping the triggers.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def summarize(body):
+    # articles.models.summarize as of this migration.
+    text = " ".join(body.split())
+    if len(text) <= SUMMARY_LENGTH:
+        return text
+    return text[: SUMMARY_LENGTH - 1].rsplit(" ", 1)[0] + "\u2026"
+
+
+def fill_summaries(apps, schema_editor):
+    Article = apps.get_model("articles", "Article")
+    articles = Article.objects.only("id", "body").order_by("id")
+    last_id = 0
+    while True:
+        batch = list(articles.filter(id__gt=last_id)[:1000])
+        if not batch:
+            return
+        for article in batch:
+            article.summary = summarize(article.body)
+        Article.objects.bulk_update(batch, ["summary"])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0006_hot_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="summary",
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.RunPython(install_search, migrations.RunPython.noop),
+        migrations.RunPython(fill_summaries, migrations.RunPython.noop),
+    ]
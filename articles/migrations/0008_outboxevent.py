@@ -0,0 +1,40 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:34
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("articles", "0007_article_summary"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("topic", models.CharField(max_length=64)),
+                ("payload", models.JSONField()),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                (
+                    "available_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="outboxevent",
+            index=models.Index(fields=["available_at", "id"], name="outbox_available"),
+        ),
+    ]
@@ -0,0 +1,171 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:38
+
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+FTS_TABLE = "articles_article_fts"
+
+# The search triggers of 0005_article_search.
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert
+    AFTER INSERT ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete
+    AFTER DELETE ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF title, body ON articles_article BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body)
+        VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body)
+        VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+
+
+def install_search(apps, schema_editor):
+    # SQLite rebuilds the table to add the column, dropping the triggers.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for sql in SQLITE_TRIGGERS:
+        schema_editor.execute(sql)
+    schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def backfill_ranking(apps, schema_editor):
+    # The formula of articles.ranking as of this migration.
+    Article = apps.get_model("articles", "Article")
+    AuthorAffinity = apps.get_model("articles", "AuthorAffinity")
+    FeedEntry = apps.get_model("articles", "FeedEntry")
+    ReadArticle = apps.get_model("articles", "ReadArticle")
+    half_life = getattr(settings, "FEED_RANK_HALF_LIFE", 6 * 3600)
+    affinity_weight = getattr(settings, "FEED_RANK_AFFINITY_WEIGHT", 1.0)
+    popularity_weight = getattr(settings, "FEED_RANK_POPULARITY_WEIGHT", 0.5)
+
+    reads = (
+        ReadArticle.objects.filter(article=models.OuterRef("pk"), is_read=True)
+        .order_by()
+        .values("article")
+        .annotate(count=models.Count("id"))
+        .values("count")
+    )
+    Article.objects.update(num_reads=Coalesce(models.Subquery(reads), 0))
+
+    affinities = (
+        ReadArticle.objects.filter(is_read=True, article__user__isnull=False)
+        .order_by()
+        .values_list("user_id", "article__user_id")
+        .annotate(reads=models.Count("id"))
+    )
+    AuthorAffinity.objects.bulk_create(
+        (
+            AuthorAffinity(user_id=user_id, author_id=author_id, reads=count)
+            for user_id, author_id, count in affinities.iterator()
+        ),
+        batch_size=1000,
+    )
+    affinity = {
+        (user_id, author_id): count
+        for user_id, author_id, count in AuthorAffinity.objects.values_list(
+            "user_id", "author_id", "reads"
+        ).iterator()
+    }
+
+    entries = FeedEntry.objects.annotate(num_reads=models.F("article__num_reads")).only(
+        "id", "subscriber", "author", "created"
+    )
+    batch = []
+    for entry in entries.iterator(chunk_size=2000):
+        entry.score = (
+            entry.created.timestamp() / half_life
+            + affinity_weight
+            * math.log2(1 + affinity.get((entry.subscriber_id, entry.author_id), 0))
+            + popularity_weight * ((1 + entry.num_reads).bit_length() - 1)
+        )
+        batch.append(entry)
+        if len(batch) == 1000:
+            FeedEntry.objects.bulk_update(batch, ["score"])
+            batch = []
+    FeedEntry.objects.bulk_update(batch, ["score"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("articles", "0008_outboxevent"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorAffinity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("reads", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="num_reads",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(install_search, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name="feedentry",
+            name="score",
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="feedentry",
+            index=models.Index(
+                fields=["subscriber", "-score", "-article"],
+                name="feedentry_subscriber_score",
+            ),
+        ),
+        migrations.AddField(
+            model_name="authoraffinity",
+            name="author",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="authoraffinity",
+            name="user",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="authoraffinity",
+            constraint=models.UniqueConstraint(
+                fields=("user", "author"), name="unique author affinity"
+            ),
+        ),
+        migrations.RunPython(backfill_ranking, migrations.RunPython.noop),
+    ]
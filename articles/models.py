@@ -1,6 +1,18 @@
 from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
+
+SUMMARY_LENGTH = 200
+
+
+def summarize(body):
+    """Whitespace-collapsed start of ``body``, cut at a word boundary."""
+    text = " ".join(body.split())
+    if len(text) <= SUMMARY_LENGTH:
+        return text
+    return text[: SUMMARY_LENGTH - 1].rsplit(" ", 1)[0] + "\u2026"
 
 
 class Article(models.Model):
@@ -8,11 +20,17 @@ class Article(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True)
     title = models.CharField(max_length=100)
     body = models.TextField()
+    # Stored for list views so they need not load the body, see save().
+    summary = models.CharField(max_length=SUMMARY_LENGTH, blank=True, editable=False)
     created = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
     readers = models.ManyToManyField(
         User, through="ReadArticle", related_name="read_articles"
     )
+    # Maintained by a database trigger, see articles.search.
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Read receipts with is_read set, recounted by articles.ranking.
+    num_reads = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return f"id {self.id} {self.title}"
@@ -20,8 +38,23 @@ class Article(models.Model):
     def get_absolute_url(self):
         return reverse("post-detail", kwargs={"pk": self.pk})
 
+    def save(self, *args, **kwargs):
+        # bulk_create skips this; bulk writers call summarize() themselves.
+        self.summary = summarize(self.body)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "body" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "summary"}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["created"]
+        # Lists and author filters page by (created, id), see KeysetPagination.
+        indexes = [
+            models.Index(fields=["-created", "-id"], name="article_created"),
+            models.Index(
+                fields=["user", "-created", "-id"], name="article_user_created"
+            ),
+        ]
 
 
 class ReadArticle(models.Model):
@@ -32,3 +65,99 @@ class ReadArticle(models.Model):
 
     def __str__(self):
         return f"{self.user.username}: {self.article.title}, read: {self.is_read}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "article"], name="unique read article"
+            )
+        ]
+        indexes = [
+            # Serves the NOT EXISTS of unread feeds; only read receipts match.
+            models.Index(
+                fields=["user", "article"],
+                condition=models.Q(is_read=True),
+                name="readarticle_read",
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Materialized feed row: an article delivered to a subscriber"""
+    subscriber = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    article = models.ForeignKey(
+        Article, on_delete=models.CASCADE, related_name="feed_entries"
+    )
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created = models.DateTimeField()
+    # Rank in the subscriber's "top" feed, see articles.ranking.
+    score = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.subscriber_id}: {self.article_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["subscriber", "article"], name="unique feed entry"
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["subscriber", "-created", "-article"],
+                name="feedentry_subscriber_created",
+            ),
+            models.Index(fields=["subscriber", "author"], name="feedentry_author"),
+            models.Index(
+                fields=["subscriber", "-score", "-article"],
+                name="feedentry_subscriber_score",
+            ),
+        ]
+
+
+class UnreadCounter(models.Model):
+    """Maintained number of unread articles in a user's feed"""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="unread_counter"
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread}"
+
+
+class AuthorAffinity(models.Model):
+    """How many articles of an author a user has read"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    reads = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id} reads {self.author_id}: {self.reads}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"], name="unique author affinity"
+            )
+        ]
+
+
+class OutboxEvent(models.Model):
+    """Follow-up work of a write, stored in the write's own transaction"""
+    topic = models.CharField(max_length=64)
+    payload = models.JSONField()
+    created = models.DateTimeField(auto_now_add=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.topic}: {self.payload}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["available_at", "id"], name="outbox_available"),
+        ]
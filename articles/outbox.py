@@ -0,0 +1,181 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.utils import timezone
+
+from articles import feed, unread
+from articles.models import Article, OutboxEvent
+from blog import metrics
+from users.models import Profile, SubscriptionUser
+
+logger = logging.getLogger(__name__)
+
+ARTICLES_CREATED = "articles.created"
+SUBSCRIPTIONS_CHANGED = "subscriptions.changed"
+AUTHORS_COOLED = "authors.cooled"
+
+
+def enabled():
+    return getattr(settings, "OUTBOX_ENABLED", False)
+
+
+def batch_size():
+    return getattr(settings, "OUTBOX_BATCH_SIZE", 50)
+
+
+def max_attempts():
+    return getattr(settings, "OUTBOX_MAX_ATTEMPTS", 10)
+
+
+def retry_delay(attempts):
+    """Seconds before the next attempt, doubling up to a maximum."""
+    return min(
+        getattr(settings, "OUTBOX_RETRY_DELAY", 1.0) * 2 ** (attempts - 1),
+        getattr(settings, "OUTBOX_RETRY_MAX_DELAY", 300),
+    )
+
+
+def publish(topic, payload):
+    """Queue work in the current transaction; it is handled after commit."""
+    OutboxEvent.objects.create(topic=topic, payload=payload)
+    metrics.incr("outbox.published")
+
+
+def articles_created(articles):
+    publish(ARTICLES_CREATED, {"articles": [article.id for article in articles]})
+
+
+def subscriptions_changed(subscriber_id, user_ids):
+    publish(
+        SUBSCRIPTIONS_CHANGED, {"subscriber": subscriber_id, "users": sorted(user_ids)}
+    )
+
+
+def authors_cooled(author_ids):
+    publish(AUTHORS_COOLED, {"authors": sorted(author_ids)})
+
+
+# Handlers run in the transaction that deletes their event, so a failed or
+# retried event never applied half its work. They read the current rows
+# instead of trusting the payload, so late or reordered events converge.
+
+
+def handle_articles_created(payload):
+    """Deliver new articles; entries delivered by an earlier try are skipped."""
+    articles = list(
+        Article.objects.filter(id__in=payload["articles"]).only(
+            "id", "user", "created", "num_reads"
+        )
+    )
+    feed.fan_out_articles(articles)
+    unread.articles_created(articles)
+
+
+def handle_subscriptions_changed(payload):
+    """Make the subscriber's feed and unread count match who they follow now."""
+    subscriber = User(pk=payload["subscriber"])
+    user_ids = set(payload["users"])
+    followed = set(
+        SubscriptionUser.objects.filter(
+            subscriber_id=subscriber.id, user_id__in=user_ids
+        ).values_list("user_id", flat=True)
+    )
+    if followed:
+        feed.backfill_subscriptions(subscriber.id, sorted(followed))
+    if user_ids - followed:
+        feed.prune_subscriptions(subscriber.id, user_ids - followed)
+    unread.rebuild(subscriber)
+
+
+def handle_authors_cooled(payload):
+    """Deliver what the authors published while hot, if they still are not."""
+    cooled = Profile.objects.filter(
+        user_id__in=payload["authors"], num_followers__lte=feed.fanout_limit()
+    ).values_list("user_id", flat=True)
+    feed.backfill_authors(list(cooled))
+
+
+HANDLERS = {
+    ARTICLES_CREATED: handle_articles_created,
+    SUBSCRIPTIONS_CHANGED: handle_subscriptions_changed,
+    AUTHORS_COOLED: handle_authors_cooled,
+}
+
+
+def handle(event):
+    try:
+        with transaction.atomic():
+            HANDLERS[event.topic](event.payload)
+            OutboxEvent.objects.filter(pk=event.pk).delete()
+    except Exception as exc:
+        event.attempts += 1
+        event.available_at = timezone.now() + timedelta(
+            seconds=retry_delay(event.attempts)
+        )
+        event.last_error = repr(exc)
+        event.save(update_fields=["attempts", "available_at", "last_error"])
+        if event.attempts >= max_attempts():
+            metrics.incr("outbox.failed")
+            logger.exception("Gave up on outbox event %s", event.pk)
+        else:
+            metrics.incr("outbox.retried")
+            logger.warning("Outbox event %s failed, retrying", event.pk, exc_info=True)
+        return
+    metrics.incr("outbox.processed")
+    metrics.timing(
+        "outbox.lag_ms", (timezone.now() - event.created).total_seconds() * 1000
+    )
+
+
+def process_batch(size=None):
+    """Handle up to ``size`` due events; returns how many were claimed.
+
+    Claimed rows stay locked until the batch commits and other workers
+    skip them, so each event is handled by one worker at a time.
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=timezone.now(), attempts__lt=max_attempts())
+            .order_by("available_at", "id")[: size or batch_size()]
+        )
+        for event in events:
+            handle(event)
+    if events:
+        metrics.timing("outbox.batch_ms", (time.perf_counter() - started) * 1000)
+    return len(events)
+
+
+def work(size=None, poll_interval=1.0, once=False, stop=None):
+    """Drain the outbox until ``stop`` is set, or until it is empty if ``once``.
+
+    Returns the number of events claimed.
+    """
+    claimed = 0
+    try:
+        while stop is None or not stop.is_set():
+            close_old_connections()
+            try:
+                count = process_batch(size)
+            except DatabaseError:
+                # Such as a lost connection; the claimed events stay queued.
+                metrics.incr("outbox.batch_errors")
+                logger.exception("Outbox batch failed")
+                count = 0
+            claimed += count
+            if count:
+                continue
+            if once:
+                break
+            if stop is None:
+                time.sleep(poll_interval)
+            else:
+                stop.wait(poll_interval)
+    finally:
+        connection.close()
+    return claimed
@@ -0,0 +1,216 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+from datetime import datetime
+
+import coreapi
+import coreschema
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple("Cursor", ["field", "descending", "reverse", "position"])
+
+
+def encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def decode_value(value):
+    if isinstance(value, dict):
+        parsed = parse_datetime(value.get("dt") or "")
+        if parsed is None:
+            raise ValueError("invalid datetime in cursor")
+        return parsed
+    return value
+
+
+def parse_cursor(encoded):
+    """Decode an opaque cursor, raising ``ValueError`` if it is malformed."""
+    try:
+        tokens = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+        value, pk = tokens["p"]
+        return Cursor(
+            tokens["f"],
+            bool(tokens.get("d")),
+            bool(tokens.get("r")),
+            (decode_value(value), pk),
+        )
+    except (TypeError, KeyError) as exc:
+        raise ValueError("invalid cursor") from exc
+
+
+def coerce_position(queryset, cursor):
+    """``cursor`` with its position converted to the types of its columns.
+
+    Raises ``ValueError`` if a value does not fit the ordering field or
+    the primary key of ``queryset``.
+    """
+    value, pk = cursor.position
+    try:
+        if cursor.field in queryset.query.annotations:
+            field = queryset.query.annotations[cursor.field].output_field
+        else:
+            field = queryset.model._meta.get_field(cursor.field)
+        value = field.to_python(value)
+        pk = queryset.model._meta.pk.to_python(pk)
+    except (FieldDoesNotExist, ValidationError, TypeError, ValueError) as exc:
+        raise ValueError("invalid cursor") from exc
+    if value is None or pk is None:
+        raise ValueError("invalid cursor")
+    return cursor._replace(position=(value, pk))
+
+
+def position_filter(field, position, descending, inclusive=False, pk="pk"):
+    """Q object selecting rows after ``position`` in (field, pk) order."""
+    value, pk_value = position
+    lookup = "lt" if descending else "gt"
+    pk_lookup = lookup + "e" if inclusive else lookup
+    return Q(**{f"{field}__{lookup}": value}) | Q(
+        **{field: value, f"{pk}__{pk_lookup}": pk_value}
+    )
+
+
+def keyset_columns(queryset, field):
+    """Columns to order and filter by for the (``field``, pk) keyset.
+
+    A queryset may annotate ``keyset_<field>`` and ``keyset_pk`` as copies
+    of those values in a joined table, so that the page is read in the
+    order of an index of that table instead of being sorted.
+    """
+    annotations = queryset.query.annotations
+    if f"keyset_{field}" in annotations and "keyset_pk" in annotations:
+        return f"keyset_{field}", "keyset_pk"
+    return field, "pk"
+
+
+class KeysetPagination(CursorPagination):
+    """Opaque cursor pagination keyed on (ordering field, id).
+
+    Each page is a range condition on the composite key, so there is no
+    OFFSET and no COUNT query, and rows inserted while a client pages do
+    not shift the pages it has not fetched yet. Passing ``page`` switches
+    to page-number pagination for clients that still need it.
+    """
+
+    ordering = "-created"
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    page_query_param = "page"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_number_paginator = None
+        if self.page_query_param in request.query_params:
+            self.page_number_paginator = PageNumberPagination()
+            return self.page_number_paginator.paginate_queryset(queryset, request, view)
+        queryset = self.get_page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.get_page(list(queryset))
+
+    def get_page_queryset(self, queryset, request, view=None):
+        """Order, filter and slice ``queryset`` for the requested page.
+
+        The returned queryset is unevaluated; pass its rows to ``get_page``.
+        """
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        order = self.get_ordering(request, queryset, view)[0]
+        self.field = order.lstrip("-")
+        self.descending = order.startswith("-")
+        self.cursor = self.decode_cursor(request, queryset)
+
+        descending = self.descending
+        if self.cursor is not None and self.cursor.reverse:
+            descending = not descending
+        prefix = "-" if descending else ""
+        column, pk = keyset_columns(queryset, self.field)
+        queryset = queryset.order_by(prefix + column, prefix + pk)
+        if self.cursor is not None:
+            queryset = queryset.filter(
+                position_filter(column, self.cursor.position, descending, pk=pk)
+            )
+        return queryset[: self.page_size + 1]
+
+    def get_page(self, rows):
+        has_more = len(rows) > self.page_size
+        self.page = rows[: self.page_size]
+        if self.cursor is not None and self.cursor.reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+        if self.page and (self.has_previous or self.has_next):
+            self.display_page_controls = True
+        return self.page
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_fields(self, view):
+        return super().get_schema_fields(view) + [
+            coreapi.Field(
+                name=self.page_query_param,
+                required=False,
+                location="query",
+                schema=coreschema.Integer(
+                    title="Page",
+                    description="Page number; switches to page-number pagination.",
+                ),
+            )
+        ]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(self.field, self.descending, False, self.get_position(self.page[-1]))
+        )
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(
+            Cursor(self.field, self.descending, True, self.get_position(self.page[0]))
+        )
+
+    def get_position(self, instance):
+        if isinstance(instance, dict):
+            return instance[self.field], instance["id"]
+        return getattr(instance, self.field), instance.pk
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor = parse_cursor(encoded)
+            if (cursor.field, cursor.descending) != (self.field, self.descending):
+                raise ValueError("cursor of another ordering")
+            return coerce_position(queryset, cursor)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        value, pk = cursor.position
+        tokens = {"f": cursor.field, "p": [encode_value(value), pk]}
+        if cursor.descending:
+            tokens["d"] = 1
+        if cursor.reverse:
+            tokens["r"] = 1
+        encoded = urlsafe_b64encode(
+            json.dumps(tokens, separators=(",", ":")).encode("ascii")
+        ).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
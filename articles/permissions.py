@@ -7,7 +7,7 @@ class IsOwnerOrStaffOrReadOnly(permissions.BasePermission):
             request.method in permissions.SAFE_METHODS or
             request.user and
             request.user.is_authenticated and
-            obj.user == request.user or
+            obj.user_id == request.user.id or
             request.user.is_staff
         )
 
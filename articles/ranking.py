@@ -0,0 +1,224 @@
+"""Precomputed scores of the ranked ("top") feed.
+
+A feed entry's score, in half-lives of ``FEED_RANK_HALF_LIFE`` seconds, is::
+
+    created / half life
+    + FEED_RANK_AFFINITY_WEIGHT * log2(1 + subscriber's reads of the author)
+    + FEED_RANK_POPULARITY_WEIGHT * floor(log2(1 + reads of the article))
+
+Ordering by it is ordering by a weight that halves every half-life. As
+that decay is relative to the article and not to the current time, scores
+never need to be recomputed as entries age. They move when a subscriber
+reads an author, for that subscriber's entries of the author, and when
+an article's reads pass a power of two, for every entry of the article.
+Read receipts do not touch the article row: its reads are recounted
+periodically by ``manage.py rebuild_feed_scores --reads-only``.
+"""
+
+import math
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import (Case, Count, ExpressionWrapper, F, FloatField,
+                              Func, OuterRef, Subquery, Value, When)
+from django.db.models.functions import Coalesce, Floor, Greatest, Log
+
+from articles.models import Article, AuthorAffinity, FeedEntry, ReadArticle
+
+
+def half_life():
+    return getattr(settings, "FEED_RANK_HALF_LIFE", 6 * 3600)
+
+
+def affinity_weight():
+    return getattr(settings, "FEED_RANK_AFFINITY_WEIGHT", 1.0)
+
+
+def popularity_weight():
+    return getattr(settings, "FEED_RANK_POPULARITY_WEIGHT", 0.5)
+
+
+def affinity_term(reads):
+    return affinity_weight() * math.log2(1 + reads)
+
+
+def popularity_bucket(reads):
+    """floor(log2(1 + reads)), which changes at powers of two only."""
+    return (1 + reads).bit_length() - 1
+
+
+def score(created, affinity, num_reads):
+    return (
+        created.timestamp() / half_life()
+        + affinity_term(affinity)
+        + popularity_weight() * popularity_bucket(num_reads)
+    )
+
+
+class Epoch(Func):
+    """Seconds since the Unix epoch of a datetime, as a float."""
+
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="CAST(EXTRACT(EPOCH FROM %(expressions)s) AS DOUBLE PRECISION)",
+            **extra_context,
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="((julianday(%(expressions)s) - 2440587.5) * 86400.0)",
+            **extra_context,
+        )
+
+
+def score_expression(affinity_terms):
+    """``score`` of articles computed in SQL, for articles without an entry.
+
+    ``affinity_terms`` maps author ids to the subscriber's affinity term.
+    """
+    # Nudged so that exact powers of two do not round down a bucket.
+    bucket = Floor(Log(2, F("num_reads") + 1) + Value(1e-9))
+    return ExpressionWrapper(
+        Epoch("created") / half_life()
+        + Case(
+            *(
+                When(user_id=author_id, then=Value(term))
+                for author_id, term in affinity_terms.items()
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+        + popularity_weight() * bucket,
+        output_field=FloatField(),
+    )
+
+
+def affinities(**filters):
+    """``{(user_id, author_id): reads}`` of the matching affinities."""
+    return {
+        (user_id, author_id): reads
+        for user_id, author_id, reads in AuthorAffinity.objects.filter(
+            **filters
+        ).values_list("user_id", "author_id", "reads")
+    }
+
+
+def read_states_changed(user, article_ids, is_read):
+    """Account for ``article_ids`` flipping to ``is_read`` for ``user``."""
+    delta = 1 if is_read else -1
+    # num_reads is left to recount_reads, so popular articles do not make
+    # every receipt wait on their row.
+    rows = list(
+        Article.objects.filter(pk__in=article_ids).values_list("pk", "user_id")
+    )
+
+    per_author = Counter(user_id for _, user_id in rows if user_id is not None)
+    if not per_author:
+        return
+    if is_read:
+        AuthorAffinity.objects.bulk_create(
+            [
+                AuthorAffinity(user_id=user.id, author_id=author_id)
+                for author_id in per_author
+            ],
+            ignore_conflicts=True,
+        )
+    by_count = {}
+    for author_id, count in per_author.items():
+        by_count.setdefault(count, []).append(author_id)
+    for count, author_ids in by_count.items():
+        AuthorAffinity.objects.filter(user_id=user.id, author_id__in=author_ids).update(
+            reads=Greatest(F("reads") + delta * count, 0)
+        )
+
+    # The updated rows stay locked until commit, so the deltas below are
+    # not interleaved with another change of the same affinity.
+    moves = {}
+    for (_, author_id), reads in affinities(
+        user_id=user.id, author_id__in=per_author
+    ).items():
+        previous = max(reads - delta * per_author[author_id], 0)
+        move = affinity_term(reads) - affinity_term(previous)
+        if move:
+            moves.setdefault(move, []).append(author_id)
+    for move, author_ids in moves.items():
+        FeedEntry.objects.filter(
+            subscriber_id=user.id, author_id__in=author_ids
+        ).update(score=F("score") + move)
+
+
+def recount_reads(articles):
+    """Recount ``num_reads`` of the ``articles`` queryset from read receipts.
+
+    Only changed counts are written, and the entries of articles whose
+    popularity bucket moved are rescored with them.
+    """
+    reads = (
+        ReadArticle.objects.filter(article=OuterRef("pk"), is_read=True)
+        .order_by()
+        .values("article")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    changed = [
+        (pk, previous, count)
+        for pk, previous, count in articles.select_for_update()
+        .annotate(count=Coalesce(Subquery(reads), 0))
+        .values_list("pk", "num_reads", "count")
+        if previous != count
+    ]
+    Article.objects.bulk_update(
+        [Article(pk=pk, num_reads=count) for pk, _, count in changed], ["num_reads"]
+    )
+    moves = {}
+    for pk, previous, count in changed:
+        move = popularity_bucket(count) - popularity_bucket(previous)
+        if move:
+            moves.setdefault(move, []).append(pk)
+    for move, article_ids in moves.items():
+        FeedEntry.objects.filter(article_id__in=article_ids).update(
+            score=F("score") + move * popularity_weight()
+        )
+
+
+def rebuild_affinities(user_ids):
+    """Recount the affinities of ``user_ids`` from their read receipts."""
+    AuthorAffinity.objects.filter(user_id__in=user_ids).delete()
+    counts = (
+        ReadArticle.objects.filter(
+            user_id__in=user_ids, is_read=True, article__user__isnull=False
+        )
+        .order_by()
+        .values_list("user_id", "article__user_id")
+        .annotate(reads=Count("id"))
+    )
+    AuthorAffinity.objects.bulk_create(
+        [
+            AuthorAffinity(user_id=user_id, author_id=author_id, reads=reads)
+            for user_id, author_id, reads in counts
+        ],
+        batch_size=1000,
+    )
+
+
+def rescore(subscriber_ids):
+    """Recompute the scores of the feed entries of ``subscriber_ids``."""
+    affinity = affinities(user_id__in=subscriber_ids)
+    entries = list(
+        FeedEntry.objects.filter(subscriber_id__in=subscriber_ids)
+        .annotate(num_reads=F("article__num_reads"))
+        .only("id", "subscriber", "author", "created")
+    )
+    for entry in entries:
+        entry.score = score(
+            entry.created,
+            affinity.get((entry.subscriber_id, entry.author_id), 0),
+            entry.num_reads,
+        )
+    FeedEntry.objects.bulk_update(entries, ["score"], batch_size=1000)
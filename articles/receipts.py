@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from articles import ranking, unread
+from articles.models import Article, ReadArticle
+
+
+def mark_read(user, article_ids, is_read=True):
+    """Upsert read receipts of ``user`` with one INSERT ... ON CONFLICT.
+
+    Returns a dict mapping every requested article id to "created",
+    "updated", "unchanged" or "not_found".
+    """
+    article_ids = list(dict.fromkeys(article_ids))
+    found = set(
+        Article.objects.filter(pk__in=article_ids).values_list("pk", flat=True)
+    )
+    with transaction.atomic():
+        previous = dict(
+            ReadArticle.objects.filter(
+                user_id=user.id, article_id__in=found
+            ).values_list("article_id", "is_read")
+        )
+        ReadArticle.objects.bulk_create(
+            [
+                ReadArticle(user_id=user.id, article_id=article_id, is_read=is_read)
+                for article_id in found
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "article"],
+            update_fields=["is_read"],
+        )
+        changed = [
+            article_id
+            for article_id in found
+            if previous.get(article_id, False) != is_read
+        ]
+        if changed:
+            unread.read_states_changed(user, changed, is_read)
+            ranking.read_states_changed(user, changed, is_read)
+
+    results = {}
+    for article_id in article_ids:
+        if article_id not in found:
+            results[article_id] = "not_found"
+        elif article_id not in previous:
+            results[article_id] = "created"
+        elif previous[article_id] != is_read:
+            results[article_id] = "updated"
+        else:
+            results[article_id] = "unchanged"
+    return results
+
+
+def save_states(states):
+    """Upsert coalesced receipts ``{(user_id, article_id): is_read}`` at once.
+
+    Receipts of deleted articles are dropped. Rows are written in key
+    order so concurrent flushes lock them in the same order.
+    """
+    found = set(
+        Article.objects.filter(
+            pk__in={article_id for _, article_id in states}
+        ).values_list("pk", flat=True)
+    )
+    states = {key: states[key] for key in sorted(states) if key[1] in found}
+    if not states:
+        return
+    with transaction.atomic():
+        previous = {
+            (user_id, article_id): is_read
+            for user_id, article_id, is_read in ReadArticle.objects.filter(
+                user_id__in={user_id for user_id, _ in states},
+                article_id__in={article_id for _, article_id in states},
+            ).values_list("user_id", "article_id", "is_read")
+        }
+        ReadArticle.objects.bulk_create(
+            [
+                ReadArticle(user_id=user_id, article_id=article_id, is_read=is_read)
+                for (user_id, article_id), is_read in states.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "article"],
+            update_fields=["is_read"],
+        )
+        changed = {}
+        for key, is_read in states.items():
+            if previous.get(key, False) != is_read:
+                changed.setdefault((key[0], is_read), []).append(key[1])
+        for (user_id, is_read), article_ids in changed.items():
+            unread.read_states_changed(User(pk=user_id), article_ids, is_read)
+            ranking.read_states_changed(User(pk=user_id), article_ids, is_read)
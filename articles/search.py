@@ -0,0 +1,63 @@
+import re
+
+from django.db import connections
+from django.db.models import Case, F, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = "english"
+FTS_TABLE = "articles_article_fts"
+
+
+def fts_query(text):
+    """Quote every word so user input cannot use FTS5 query syntax."""
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"' for word in words)
+
+
+def search(queryset, text):
+    """Filter ``queryset`` to articles matching ``text``, annotated with ``rank``."""
+    vendor = connections[queryset.db].vendor
+    if vendor == "postgresql":
+        from django.contrib.postgres.search import SearchQuery, SearchRank
+
+        query = SearchQuery(text, config=SEARCH_CONFIG, search_type="websearch")
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F("search_vector"), query)
+        )
+    if vendor == "sqlite":
+        match = fts_query(text)
+        if not match:
+            return queryset.none()
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]
+            )
+        ).annotate(
+            rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = articles_article.id",
+                [match],
+                output_field=FloatField(),
+            )
+        )
+    return substring_search(queryset, text)
+
+
+def substring_search(queryset, text):
+    """Match every word of ``text`` in the title or body, without an index.
+
+    Used on databases without full-text search; titles containing a word
+    rank above bodies containing it.
+    """
+    words = re.findall(r"\w+", text)
+    if not words:
+        return queryset.none()
+    rank = Value(0.0)
+    for word in words:
+        queryset = queryset.filter(Q(title__icontains=word) | Q(body__icontains=word))
+        rank += Case(
+            When(title__icontains=word, then=Value(1.0)),
+            default=Value(0.5),
+            output_field=FloatField(),
+        )
+    return queryset.annotate(rank=rank)
@@ -1,17 +1,59 @@
 from rest_framework import serializers
 
 from articles.models import Article, ReadArticle
+from articles.pagination import coerce_position, parse_cursor
 
 
 class ArticleSerializer(serializers.ModelSerializer):
     # read = serializers.BooleanField(source='readarticle__is_read')
     class Meta:
         model = Article
-        fields = ("id", "user", "title", "body", "created", "updated")
+        fields = ("id", "user", "title", "body", "summary", "created", "updated")
         read_only_fields = ["user"]
 
 
+class ArticleImportSerializer(serializers.ModelSerializer):
+    """One exported article. Authors are checked per batch on import."""
+
+    user = serializers.IntegerField()
+    created = serializers.DateTimeField(required=False)
+    updated = serializers.DateTimeField(required=False)
+
+    class Meta:
+        model = Article
+        fields = ("user", "title", "body", "created", "updated")
+
+
 class ReadArticleSerializer(serializers.ModelSerializer):
     class Meta:
         model = ReadArticle
         fields = ("user", "article", "is_read")
+
+
+class ReadArticleReceiptSerializer(serializers.Serializer):
+    """A receipt accepted into the write-behind buffer."""
+
+    article = serializers.IntegerField()
+    is_read = serializers.BooleanField()
+
+
+class ReadArticleBulkSerializer(serializers.Serializer):
+    articles = serializers.ListField(
+        child=serializers.IntegerField(), required=False, max_length=1000
+    )
+    up_to = serializers.CharField(required=False)
+    is_read = serializers.BooleanField(default=True)
+
+    def validate_up_to(self, value):
+        try:
+            cursor = coerce_position(Article.objects.all(), parse_cursor(value))
+        except ValueError:
+            raise serializers.ValidationError("invalid cursor")
+        if cursor.reverse:
+            raise serializers.ValidationError("use a next-page cursor")
+        return cursor
+
+    def validate(self, attrs):
+        if ("articles" in attrs) == ("up_to" in attrs):
+            raise serializers.ValidationError("provide either articles or up_to")
+        return attrs
@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from articles import cache, feed, outbox, unread
+from articles.models import Article
+from users import subscriptions
+from users.models import SubscriptionUser
+
+# With OUTBOX_ENABLED, work that grows with the number of followers is
+# queued in the write's transaction and done by "manage.py drain_outbox".
+
+
+@receiver(post_save, sender=Article)
+def article_saved(sender, instance, created, **kwargs):
+    # After the commit, or a concurrent read could cache the old rows
+    # under the new version.
+    transaction.on_commit(cache.bump_version)
+    if created:
+        if outbox.enabled():
+            outbox.articles_created([instance])
+        else:
+            feed.fan_out_article(instance)
+            unread.article_created(instance)
+
+
+@receiver(pre_delete, sender=Article)
+def article_deleting(sender, instance, **kwargs):
+    unread.article_deleted(instance)
+
+
+@receiver(post_delete, sender=Article)
+def article_deleted(sender, instance, **kwargs):
+    transaction.on_commit(cache.bump_version)
+
+
+@receiver(post_save, sender=SubscriptionUser)
+def subscription_saved(sender, instance, created, **kwargs):
+    if created:
+        if outbox.enabled():
+            outbox.subscriptions_changed(instance.subscriber_id, [instance.user_id])
+        else:
+            feed.backfill_subscription(instance)
+            unread.subscription_changed(instance, 1)
+
+
+@receiver(pre_delete, sender=SubscriptionUser)
+def subscription_deleting(sender, instance, **kwargs):
+    if not outbox.enabled() and not subscriptions.is_batched():
+        unread.subscription_changed(instance, -1)
+
+
+@receiver(post_delete, sender=SubscriptionUser)
+def subscription_deleted(sender, instance, **kwargs):
+    if subscriptions.is_batched():
+        return
+    if outbox.enabled():
+        outbox.subscriptions_changed(instance.subscriber_id, [instance.user_id])
+    else:
+        feed.prune_subscription(instance)
@@ -0,0 +1,122 @@
+import itertools
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from articles import cache, feed, outbox, unread
+from articles.models import Article, summarize
+from articles.serializers import ArticleImportSerializer
+from blog.serialization import ORJSONRenderer
+from users import counters
+
+# Errors beyond this many are only counted, not reported line by line.
+MAX_REPORTED_ERRORS = 100
+
+
+def export_chunk_size():
+    return getattr(settings, "ARTICLES_EXPORT_CHUNK_SIZE", 2000)
+
+
+def import_batch_size():
+    return getattr(settings, "ARTICLES_IMPORT_BATCH_SIZE", 1000)
+
+
+def export_lines(rows, to_representation_rows):
+    """Encode ``rows`` as NDJSON, one chunk of lines at a time."""
+    renderer = ORJSONRenderer()
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, export_chunk_size()))
+        if not chunk:
+            return
+        yield b"".join(
+            renderer.render(item) + b"\n" for item in to_representation_rows(chunk)
+        )
+
+
+class Importer:
+    """Validate NDJSON article lines and insert them in batches.
+
+    Each batch is inserted with ``bulk_create`` in its own transaction,
+    followed by the feed, unread and profile bookkeeping that the
+    ``post_save`` signals would have done per article.
+    """
+
+    def __init__(self):
+        self.serializer = ArticleImportSerializer()
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line, detail):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "errors": detail})
+
+    def run(self, lines):
+        batch = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                data = self.serializer.run_validation(json.loads(line))
+            except ValueError:
+                self.error(number, {"non_field_errors": ["Invalid JSON."]})
+            except ValidationError as exc:
+                self.error(number, exc.detail)
+            else:
+                batch.append((number, data))
+            if len(batch) == import_batch_size():
+                self.save(batch)
+                batch = []
+        if batch:
+            self.save(batch)
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda error: error["line"]),
+        }
+
+    def save(self, batch):
+        user_ids = set(
+            User.objects.filter(
+                id__in={data["user"] for _, data in batch}
+            ).values_list("id", flat=True)
+        )
+        now = timezone.now()
+        articles, timestamps = [], []
+        for number, data in batch:
+            if data["user"] not in user_ids:
+                self.error(number, {"user": ["Unknown user."]})
+                continue
+            created = data.get("created", now)
+            timestamps.append((created, data.get("updated", created)))
+            articles.append(
+                Article(
+                    user_id=data["user"],
+                    title=data["title"],
+                    body=data["body"],
+                    summary=summarize(data["body"]),
+                )
+            )
+        if not articles:
+            return
+
+        with transaction.atomic():
+            Article.objects.bulk_create(articles)
+            # bulk_create stamps auto_now(_add) fields, bulk_update does not.
+            for article, (created, updated) in zip(articles, timestamps):
+                article.created, article.updated = created, updated
+            Article.objects.bulk_update(articles, ["created", "updated"])
+            if outbox.enabled():
+                outbox.articles_created(articles)
+            else:
+                feed.fan_out_articles(articles)
+                unread.articles_created(articles)
+            counters.articles_created(articles)
+        cache.bump_version()
+        self.created += len(articles)
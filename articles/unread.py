@@ -0,0 +1,107 @@
+from collections import Counter
+
+from django.db.models import Exists, F, OuterRef
+from django.db.models.functions import Greatest
+
+from articles.feed import feed_queryset, is_hot_author
+from articles.models import FeedEntry, ReadArticle, UnreadCounter
+from users.models import SubscriptionUser
+
+
+def read_receipts(user_id):
+    return ReadArticle.objects.filter(
+        user_id=user_id, article=OuterRef("pk"), is_read=True
+    )
+
+
+def unread_queryset(user):
+    """Feed articles without a read receipt of ``user`` (NOT EXISTS)."""
+    return feed_queryset(user).filter(~Exists(read_receipts(user.id)))
+
+
+def adjust(counters, delta):
+    """Add ``delta`` to the given counters in a single UPDATE.
+
+    Users without a counter row are skipped; their row is computed from
+    scratch the first time the count is read.
+    """
+    if delta:
+        counters.update(unread=Greatest(F("unread") + delta, 0))
+
+
+def unread_count(user):
+    counter = UnreadCounter.objects.filter(user_id=user.id).first()
+    if counter is None:
+        counter = rebuild(user)
+    return counter.unread
+
+
+def rebuild(user):
+    counter, _ = UnreadCounter.objects.update_or_create(
+        user_id=user.id, defaults={"unread": unread_queryset(user).count()}
+    )
+    return counter
+
+
+def article_created(article):
+    articles_created([article])
+
+
+def articles_created(articles):
+    per_author = Counter(article.user_id for article in articles)
+    for author_id, count in per_author.items():
+        adjust(
+            UnreadCounter.objects.filter(
+                user_id__in=SubscriptionUser.objects.filter(
+                    user_id=author_id
+                ).values("subscriber_id")
+            ),
+            count,
+        )
+
+
+def article_deleted(article):
+    if is_hot_author(article.user_id):
+        subscribers = SubscriptionUser.objects.filter(user_id=article.user_id)
+    else:
+        # Only the feeds it was delivered to, which through the outbox may
+        # be none yet.
+        subscribers = FeedEntry.objects.filter(article_id=article.id)
+    adjust(
+        UnreadCounter.objects.filter(
+            user_id__in=subscribers.values("subscriber_id")
+        ).exclude(
+            user_id__in=ReadArticle.objects.filter(
+                article_id=article.id, is_read=True
+            ).values("user_id")
+        ),
+        -1,
+    )
+
+
+def subscription_changed(subscription, sign):
+    """Count the followed author's unread articles in or out of the feed."""
+    subscriber = subscription.subscriber
+    unread = (
+        unread_queryset(subscriber).filter(user_id=subscription.user_id).count()
+    )
+    adjust(UnreadCounter.objects.filter(user_id=subscriber.id), sign * unread)
+
+
+def subscriptions_changed(subscriber, author_ids, sign):
+    """``subscription_changed`` for many authors of one subscriber."""
+    unread = unread_queryset(subscriber).filter(user_id__in=author_ids).count()
+    adjust(UnreadCounter.objects.filter(user_id=subscriber.id), sign * unread)
+
+
+def read_state_changed(user, article_id, is_read):
+    read_states_changed(user, [article_id], is_read)
+
+
+def read_states_changed(user, article_ids, is_read):
+    """Account for ``article_ids`` flipping to ``is_read`` for ``user``."""
+    changed = feed_queryset(user).filter(pk__in=article_ids).count()
+    adjust(
+        UnreadCounter.objects.filter(user_id=user.id),
+        -changed if is_read else changed,
+    )
@@ -1,6 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
 
+from articles import async_views
 from articles.views import ArticleViewSet, ReadArticleViewSet
 
 router = SimpleRouter()
@@ -9,5 +10,8 @@ router.register("", ArticleViewSet, basename="articles")
 router.register("read_articles", ReadArticleViewSet)
 
 urlpatterns = [
-    path("", include(router.urls))
+    path("async/", async_views.article_list, name="async-articles-list"),
+    path("async/feed/", async_views.feed, name="async-articles-feed"),
+    path("async/feed_read/", async_views.feed_read, name="async-articles-feed-read"),
+    path("", include(router.urls)),
 ]
@@ -1,38 +1,104 @@
+from operator import itemgetter
+
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from requests import Response
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.filters import OrderingFilter
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.response import Response
 
+from articles import ranking, receipts, transfer, unread, writebehind
+from articles.cache import CachedResponseMixin
+from articles.feed import feed_queryset, ranked_feed_queryset
+from articles.filters import ArticleFilter, ArticleOrderingFilter
 from articles.models import Article, ReadArticle
+from articles.pagination import KeysetPagination, position_filter
 from articles.permissions import IsOwnerOrStaffOrReadOnly
-from articles.serializers import ArticleSerializer, ReadArticleSerializer
+from articles.serializers import (ArticleSerializer, ReadArticleBulkSerializer,
+                                  ReadArticleReceiptSerializer,
+                                  ReadArticleSerializer)
+from blog.instrumentation import TimedSerializerMixin
+from blog.routers import ReplicaReadMixin
+from blog.serialization import (SparseFieldsetMixin, ValuesListMixin,
+                                datetime_formatter, split_names)
 from users.models import SubscriptionUser
 
 
-class ArticleViewSet(viewsets.ModelViewSet):
+class ArticleViewSet(
+    ReplicaReadMixin,
+    CachedResponseMixin,
+    TimedSerializerMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Article.objects.all()
     serializer_class = ArticleSerializer
     permission_classes = [IsOwnerOrStaffOrReadOnly]
-    filter_backends = [DjangoFilterBackend, OrderingFilter]
-    ordering_fields = ["created", "updated"]
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, ArticleOrderingFilter]
+    filterset_class = ArticleFilter
+    ordering_fields = ["created", "updated", "rank", "score"]
     ordering = ["-created"]
+    values_actions = ("list", "feed", "feed_read")
+    values_fields = ("id", "user_id", "title", "body", "summary", "created", "updated")
+    sparse_actions = ("list", "retrieve", "feed", "feed_read")
+    sparse_columns = {"user": ("user_id",)}
+    # Keyset pagination reads the position from these.
+    sparse_required = ("id", "created", "updated")
 
     def get_queryset(self):
         queryset = super().get_queryset()
+        if "is_read" in self.request.query_params:
+            # ArticleFilter.filter_is_read reads the receipts.
+            writebehind.buffer.flush_user(self.request.user)
         if self.action == 'feed':
-            queryset = Article.objects.filter(user__authors__subscriber=self.request.user)
+            if self.is_ranked():
+                queryset = ranked_feed_queryset(self.request.user)
+            else:
+                queryset = feed_queryset(self.request.user)
         elif self.action == 'feed_read':
-            queryset = Article.objects.filter(
-                Q(user__authors__subscriber=self.request.user, readarticle__is_read=False)
-                | Q(user__authors__subscriber=self.request.user, readarticle__is_read=None)
-            )
+            writebehind.buffer.flush_user(self.request.user)
+            queryset = unread.unread_queryset(self.request.user)
         return queryset
 
+    def is_ranked(self):
+        """Whether the "top" feed, ``?ordering=-score``, was requested."""
+        ordering = self.request.query_params.get(ArticleOrderingFilter.ordering_param)
+        return any(term.lstrip("-") == "score" for term in split_names(ordering or ""))
+
+    def to_representation_rows(self, rows):
+        """Rows as ``ArticleSerializer`` would render them."""
+        format_datetime = datetime_formatter()
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return [
+                {
+                    "id": row["id"],
+                    "user": row["user_id"],
+                    "title": row["title"],
+                    "body": row["body"],
+                    "summary": row["summary"],
+                    "created": format_datetime(row["created"]),
+                    "updated": format_datetime(row["updated"]),
+                }
+                for row in rows
+            ]
+        getters = {
+            "id": itemgetter("id"),
+            "user": itemgetter("user_id"),
+            "title": itemgetter("title"),
+            "body": itemgetter("body"),
+            "summary": itemgetter("summary"),
+            "created": lambda row: format_datetime(row["created"]),
+            "updated": lambda row: format_datetime(row["updated"]),
+        }
+        getters = [(name, getters[name]) for name in fieldset]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
     @action(
         detail=False,
         permission_classes=[IsAuthenticated],
@@ -49,11 +115,50 @@ class ArticleViewSet(viewsets.ModelViewSet):
     def feed_read(self, request, *args, **kwargs):
         return super().list(self, request, *args, **kwargs)
 
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def export(self, request, *args, **kwargs):
+        """Stream the (filtered) articles as NDJSON in id order."""
+        queryset = (
+            self.filter_queryset(self.get_queryset())
+            .order_by("pk")
+            .values(*self.values_fields)
+        )
+        response = StreamingHttpResponse(
+            transfer.export_lines(
+                queryset.iterator(chunk_size=transfer.export_chunk_size()),
+                self.to_representation_rows,
+            ),
+            content_type="application/x-ndjson",
+        )
+        response["Content-Disposition"] = 'attachment; filename="articles.ndjson"'
+        return response
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[IsAdminUser],
+    )
+    def import_articles(self, request, *args, **kwargs):
+        """Create articles from an NDJSON body in the export format.
+
+        The body is read line by line rather than parsed as a whole.
+        """
+        return Response(transfer.Importer().run(request.stream or []))
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def unread_count(self, request, *args, **kwargs):
+        writebehind.buffer.flush_user(request.user)
+        return Response({"unread": unread.unread_count(request.user)})
+
     def perform_create(self, serializer):
-        return serializer.save(user=self.request.user)
+        with transaction.atomic():
+            return serializer.save(user_id=self.request.user.id)
 
 
-class ReadArticleViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet):
+class ReadArticleViewSet(
+    TimedSerializerMixin, mixins.UpdateModelMixin, viewsets.GenericViewSet
+):
     queryset = ReadArticle.objects.all()
     serializer_class = ReadArticleSerializer
     permission_classes = [IsAuthenticated]
@@ -61,6 +166,76 @@ class ReadArticleViewSet(mixins.UpdateModelMixin, viewsets.GenericViewSet):
 
     def get_object(self):
         obj, _ = ReadArticle.objects.get_or_create(
-            user=self.request.user, article_id=self.kwargs["article"]
+            user_id=self.request.user.id, article_id=self.kwargs["article"]
         )
         return obj
+
+    def update(self, request, *args, **kwargs):
+        if not writebehind.enabled() or "is_read" not in request.data:
+            return super().update(request, *args, **kwargs)
+        serializer = ReadArticleReceiptSerializer(
+            data={"article": kwargs["article"], "is_read": request.data["is_read"]}
+        )
+        serializer.is_valid(raise_exception=True)
+        receipt = serializer.validated_data
+        writebehind.buffer.add(request.user.id, receipt["article"], receipt["is_read"])
+        return Response(
+            {"user": request.user.id, **receipt}, status=status.HTTP_202_ACCEPTED
+        )
+
+    def perform_update(self, serializer):
+        was_read = serializer.instance.is_read
+        with transaction.atomic():
+            instance = serializer.save()
+            if instance.is_read != was_read:
+                unread.read_state_changed(
+                    self.request.user, instance.article_id, instance.is_read
+                )
+                ranking.read_states_changed(
+                    self.request.user, [instance.article_id], instance.is_read
+                )
+
+    @action(detail=False, methods=["post"], serializer_class=ReadArticleBulkSerializer)
+    def bulk(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        writebehind.buffer.flush_user(request.user)
+        is_read = serializer.validated_data["is_read"]
+        if "articles" in serializer.validated_data:
+            results = receipts.mark_read(
+                request.user, serializer.validated_data["articles"], is_read
+            )
+        else:
+            results = {}
+            for chunk in self.feed_chunks(serializer.validated_data["up_to"]):
+                results.update(receipts.mark_read(request.user, chunk, is_read))
+        return Response(
+            {
+                "results": [
+                    {"article": article_id, "status": result}
+                    for article_id, result in results.items()
+                ]
+            }
+        )
+
+    def feed_chunks(self, cursor, size=1000):
+        """Ids of feed articles from the top of the feed down to ``cursor``."""
+        if cursor.field not in ("created", "updated"):
+            raise serializers.ValidationError({"up_to": "invalid cursor"})
+        article_ids = (
+            feed_queryset(self.request.user)
+            .filter(
+                position_filter(
+                    cursor.field, cursor.position, not cursor.descending, True
+                )
+            )
+            .values_list("pk", flat=True)
+        )
+        chunk = []
+        for article_id in article_ids.iterator(chunk_size=size):
+            chunk.append(article_id)
+            if len(chunk) == size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
@@ -0,0 +1,184 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from articles import receipts
+from blog import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def enabled():
+    return getattr(settings, "READ_RECEIPTS_WRITE_BEHIND", False)
+
+
+def max_size():
+    return getattr(settings, "READ_RECEIPTS_BUFFER_SIZE", 1000)
+
+
+def flush_interval():
+    return getattr(settings, "READ_RECEIPTS_FLUSH_INTERVAL", 1.0)
+
+
+def buffer_limit():
+    return getattr(settings, "READ_RECEIPTS_BUFFER_LIMIT", 10 * max_size())
+
+
+class ReceiptBuffer:
+    """Bounded in-process buffer of read receipts, written behind requests.
+
+    Receipts are kept per user as ``{article_id: is_read}``, so repeated
+    writes to the same article coalesce into the last one. The buffer is
+    flushed in one batch upsert when it holds ``READ_RECEIPTS_BUFFER_SIZE``
+    receipts (by the request that fills it), every
+    ``READ_RECEIPTS_FLUSH_INTERVAL`` seconds by a background thread and at
+    interpreter exit. A batch that fails to write is put back and retried
+    by the background thread; requests wait an interval, at least a
+    second, before trying again. Past ``READ_RECEIPTS_BUFFER_LIMIT``
+    receipts, counting the batch being written, a new receipt is written
+    at once instead of buffered.
+    Pending receipts of a process are lost if it dies.
+
+    Reads of a user flush that user's receipts first, waiting for a batch
+    being written, but only those buffered by the same process: a receipt
+    written through one worker is visible to reads served by another one
+    only after it is flushed.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Held while a batch is written, so one batch is in flight at most.
+        self.flush_lock = threading.Lock()
+        self.pending = {}
+        self.depth = 0
+        self.in_flight = set()
+        self.in_flight_depth = 0
+        self.retry_at = 0
+        self.thread = None
+
+    def add(self, user_id, article_id, is_read):
+        with self.lock:
+            receipts_of_user = self.pending.get(user_id, {})
+            full = (
+                article_id not in receipts_of_user
+                and self.depth + self.in_flight_depth >= buffer_limit()
+            )
+            if not full:
+                receipts_of_user = self.pending.setdefault(user_id, {})
+                if article_id not in receipts_of_user:
+                    self.depth += 1
+                receipts_of_user[article_id] = is_read
+            depth = self.depth
+            if self.thread is None and flush_interval() > 0:
+                self.thread = threading.Thread(
+                    target=self.run, name="read-receipts-flusher", daemon=True
+                )
+                self.thread.start()
+        if full:
+            metrics.incr("receipts.buffer_full")
+            self.write_through(user_id, article_id, is_read)
+            return
+        metrics.gauge("receipts.buffer_depth", depth)
+        if depth >= max_size() and time.monotonic() >= self.retry_at:
+            self.flush(blocking=False)
+
+    def write_through(self, user_id, article_id, is_read):
+        """Write one receipt now, after any older state of it in flight."""
+        with self.flush_lock:
+            with self.lock:
+                receipts_of_user = self.pending.get(user_id, {})
+                if receipts_of_user.pop(article_id, None) is not None:
+                    self.depth -= 1
+            receipts.save_states({(user_id, article_id): is_read})
+
+    def take(self, user_id=None):
+        with self.lock:
+            if user_id is None:
+                pending, self.pending = self.pending, {}
+            else:
+                pending = {}
+                if user_id in self.pending:
+                    pending[user_id] = self.pending.pop(user_id)
+            taken = sum(map(len, pending.values()))
+            self.depth -= taken
+            self.in_flight = set(pending)
+            self.in_flight_depth = taken
+            depth = self.depth
+        metrics.gauge("receipts.buffer_depth", depth)
+        return {
+            (user_id, article_id): is_read
+            for user_id, receipts_of_user in pending.items()
+            for article_id, is_read in receipts_of_user.items()
+        }
+
+    def restore(self, states):
+        """Put back taken receipts, unless written again since."""
+        with self.lock:
+            for (user_id, article_id), is_read in states.items():
+                receipts_of_user = self.pending.setdefault(user_id, {})
+                if article_id not in receipts_of_user:
+                    receipts_of_user[article_id] = is_read
+                    self.depth += 1
+            depth = self.depth
+        metrics.gauge("receipts.buffer_depth", depth)
+
+    def flush(self, user_id=None, blocking=True):
+        """Write the pending receipts, or only those of ``user_id``.
+
+        Without ``blocking``, return at once if a batch is being written.
+        """
+        if not self.flush_lock.acquire(blocking):
+            return
+        try:
+            self.write(user_id)
+        finally:
+            with self.lock:
+                self.in_flight = set()
+                self.in_flight_depth = 0
+            self.flush_lock.release()
+
+    def write(self, user_id):
+        states = self.take(user_id)
+        if not states:
+            return
+        started = time.perf_counter()
+        try:
+            receipts.save_states(states)
+        except Exception:
+            self.restore(states)
+            self.retry_at = time.monotonic() + max(flush_interval(), 1.0)
+            metrics.incr("receipts.flush_errors")
+            logger.exception("Failed to write %d buffered read receipts", len(states))
+            return
+        metrics.timing("receipts.flush_ms", (time.perf_counter() - started) * 1000)
+        metrics.incr("receipts.flushed", len(states))
+
+    def flush_user(self, user):
+        """Make ``user``'s receipts buffered here visible to their own reads.
+
+        This queries the database, so async code calls it through
+        ``sync_to_async``.
+        """
+        if not user.is_authenticated:
+            return
+        with self.lock:
+            waiting = user.id in self.pending or user.id in self.in_flight
+        if waiting:
+            self.flush(user.id)
+
+    def run(self):
+        while True:
+            time.sleep(flush_interval())
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+buffer = ReceiptBuffer()
+atexit.register(buffer.flush)
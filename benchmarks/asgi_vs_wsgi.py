@@ -0,0 +1,130 @@
+"""Compare feed throughput of the ASGI async views with the WSGI views.
+
+Both applications are driven in-process against the configured database,
+so run it against the same Postgres a deployment would use::
+
+    python -m benchmarks.asgi_vs_wsgi --user alex --requests 500 --concurrency 50
+
+The WSGI side models a worker with ``--concurrency`` threads calling
+``/api/articles/feed/``; the ASGI side issues the same number of
+concurrent requests to ``/api/articles/async/feed/`` on one event loop.
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, latencies, elapsed):
+    print(
+        f"{name:<6} {len(latencies) / elapsed:>9.1f} req/s"
+        f"  p50 {statistics.median(latencies) * 1000:>8.2f} ms"
+        f"  p99 {percentile(latencies, 0.99) * 1000:>8.2f} ms"
+    )
+
+
+def run_wsgi(application, path, token, requests, concurrency):
+    def call():
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "localhost",
+            "SERVER_PORT": "80",
+            "HTTP_HOST": "localhost",
+            "HTTP_AUTHORIZATION": f"Bearer {token}",
+            "wsgi.input": io.BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+        }
+        statuses = []
+        started = time.perf_counter()
+        b"".join(application(environ, lambda status, headers: statuses.append(status)))
+        assert statuses[0].startswith("200"), statuses[0]
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda _: call(), range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+async def run_asgi(application, path, token, requests, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call():
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [
+                (b"host", b"localhost"),
+                (b"authorization", f"Bearer {token}".encode()),
+            ],
+        }
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        async with semaphore:
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            assert messages[0]["status"] == 200, messages[0]["status"]
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(call() for _ in range(requests)))
+    return latencies, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", required=True, help="username to read the feed of")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+    django.setup()
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from blog.asgi import application as asgi_application
+    from blog.wsgi import application as wsgi_application
+
+    token = str(AccessToken.for_user(User.objects.get(username=args.user)))
+    latencies, elapsed = run_wsgi(
+        wsgi_application, "/api/articles/feed/", token, args.requests, args.concurrency
+    )
+    report("wsgi", latencies, elapsed)
+    latencies, elapsed = asyncio.run(
+        run_asgi(
+            asgi_application,
+            "/api/articles/async/feed/",
+            token,
+            args.requests,
+            args.concurrency,
+        )
+    )
+    report("asgi", latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
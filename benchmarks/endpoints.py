@@ -0,0 +1,263 @@
+"""Latency and query counts of every article and user route.
+
+Each route is called in-process through the Django test client as one
+user, usually the one following the most authors, after seeding data::
+
+    python manage.py seed --users 10000 --articles 1000000
+    python -m benchmarks.endpoints --requests 50
+
+It runs against the configured database; set ``BLOG_SQLITE=1`` to use the
+local SQLite file instead of Postgres. Writes happen in a transaction
+that is rolled back at the end, so runs are repeatable.
+"""
+
+import argparse
+import logging
+import json
+import os
+import statistics
+import time
+from collections import namedtuple
+
+import django
+
+# ``prepare(context)`` runs untimed and returns (path, data, authenticated).
+Case = namedtuple("Case", ["name", "method", "prepare"])
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def cases():
+    from django.contrib.auth.models import User
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    from articles.models import Article
+    from users.models import SubscriptionUser
+
+    def get(path, authenticated=True):
+        return lambda context: (path, None, authenticated)
+
+    def own_article(context):
+        return Article.objects.create(
+            title="Benchmark", body="benchmark body", user=context["user"]
+        )
+
+    def not_followed(context):
+        return (
+            User.objects.exclude(authors__subscriber=context["user"])
+            .exclude(pk=context["user"].pk)
+            .order_by("-id")
+            .first()
+        )
+
+    def subscription(context):
+        return SubscriptionUser.objects.create(
+            user=not_followed(context), subscriber=context["user"]
+        )
+
+    def article(context):
+        return f"/api/articles/{context['article'].pk}/"
+
+    return [
+        Case("articles list (anonymous)", "get", get("/api/articles/", False)),
+        Case("articles list", "get", get("/api/articles/?page_size=100")),
+        Case(
+            "articles list by updated", "get", get("/api/articles/?ordering=-updated")
+        ),
+        Case("articles search", "get", get("/api/articles/?q=postgres+index")),
+        Case("articles detail", "get", lambda context: (article(context), None, True)),
+        Case(
+            "articles create",
+            "post",
+            lambda context: (
+                "/api/articles/",
+                {"title": "Benchmark", "body": "benchmark body"},
+                True,
+            ),
+        ),
+        Case(
+            "articles update",
+            "patch",
+            lambda context: (
+                f"/api/articles/{own_article(context).pk}/",
+                {"title": "Updated"},
+                True,
+            ),
+        ),
+        Case(
+            "articles delete",
+            "delete",
+            lambda context: (f"/api/articles/{own_article(context).pk}/", None, True),
+        ),
+        Case("articles feed", "get", get("/api/articles/feed/")),
+        Case("articles feed_read", "get", get("/api/articles/feed_read/")),
+        Case("articles unread_count", "get", get("/api/articles/unread_count/")),
+        Case(
+            "read_articles update",
+            "patch",
+            lambda context: (
+                f"/api/articles/read_articles/{context['article'].pk}/",
+                {"is_read": True},
+                True,
+            ),
+        ),
+        Case(
+            "read_articles bulk",
+            "post",
+            lambda context: (
+                "/api/articles/read_articles/bulk/",
+                {"articles": context["feed_ids"]},
+                True,
+            ),
+        ),
+        Case("async articles list", "get", get("/api/articles/async/", False)),
+        Case("async articles feed", "get", get("/api/articles/async/feed/")),
+        Case("async articles feed_read", "get", get("/api/articles/async/feed_read/")),
+        Case("users list", "get", get("/api/users/profile/")),
+        Case("users list compact", "get", get("/api/users/profile/?compact=1")),
+        Case(
+            "users list by articles",
+            "get",
+            get("/api/users/profile/?compact=1&ordering=-num_articles"),
+        ),
+        Case("users current", "get", get("/api/users/profile/current/")),
+        Case(
+            "async users detail",
+            "get",
+            lambda context: (
+                f"/api/users/async/profile/{context['user'].pk}/",
+                None,
+                True,
+            ),
+        ),
+        Case("subscribe list", "get", get("/api/users/subscribe/")),
+        Case(
+            "subscribe create",
+            "post",
+            lambda context: (
+                "/api/users/subscribe/",
+                {"user": not_followed(context).pk},
+                True,
+            ),
+        ),
+        Case(
+            "subscribe delete",
+            "delete",
+            lambda context: (
+                f"/api/users/subscribe/{subscription(context).pk}/",
+                None,
+                True,
+            ),
+        ),
+        Case(
+            "subscribe bulk",
+            "post",
+            lambda context: (
+                "/api/users/subscribe/bulk/",
+                {"users": context["bulk_user_ids"]},
+                True,
+            ),
+        ),
+        Case(
+            "login",
+            "post",
+            lambda context: (
+                "/api/users/login/",
+                {"username": context["user"].username, "password": context["password"]},
+                False,
+            ),
+        ),
+        Case(
+            "token refresh",
+            "post",
+            lambda context: (
+                "/api/users/token/refresh/",
+                {"refresh": str(RefreshToken.for_user(context["user"]))},
+                False,
+            ),
+        ),
+    ]
+
+
+def run(client, case, context, requests):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies, queries = [], []
+    for _ in range(requests):
+        path, data, authenticated = case.prepare(context)
+        kwargs = {"HTTP_HOST": "localhost"}
+        if authenticated:
+            kwargs["HTTP_AUTHORIZATION"] = f"Bearer {context['token']}"
+        if data is not None:
+            kwargs["data"] = json.dumps(data)
+            kwargs["content_type"] = "application/json"
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = getattr(client, case.method)(path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+        assert response.status_code < 400, (case.name, response.status_code)
+        queries.append(len(captured))
+    return latencies, queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--user", help="username; defaults to the top follower")
+    parser.add_argument("--password", default="seed")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--only", help="run the cases whose name contains this")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+    django.setup()
+    # Per-request timing logs would drown the report.
+    logging.getLogger("blog.requests").setLevel(logging.WARNING)
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from articles.feed import feed_queryset
+    from users.models import Profile
+
+    if args.user:
+        user = User.objects.get(username=args.user)
+    else:
+        user = Profile.objects.order_by("-num_following").first().user
+    context = {
+        "user": user,
+        "password": args.password,
+        "token": str(AccessToken.for_user(user)),
+        "article": feed_queryset(user).order_by("-created").first(),
+        "bulk_user_ids": list(
+            User.objects.order_by("-id").values_list("pk", flat=True)[:100]
+        ),
+        "feed_ids": list(
+            feed_queryset(user).order_by("-created").values_list("pk", flat=True)[:100]
+        ),
+    }
+    assert context["article"] is not None, f"{user} has an empty feed, seed data first"
+
+    print(f"{connection.vendor}, user {user.username}, {args.requests} requests each")
+    print(f"{'route':<28} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}")
+    client = Client()
+    with transaction.atomic():
+        for case in cases():
+            if args.only and args.only not in case.name:
+                continue
+            latencies, queries = run(client, case, context, args.requests)
+            print(
+                f"{case.name:<28}"
+                f" {statistics.median(latencies) * 1000:>9.2f}"
+                f" {percentile(latencies, 0.99) * 1000:>9.2f}"
+                f" {statistics.median(queries):>8g}"
+            )
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Latency of the ranked ("top") feed of a reader following 10k authors.
+
+A new reader follows ``--authors`` seeded authors (backfilling their feed
+like a bulk subscribe does) and reads a share of it, which maintains the
+affinities and scores incrementally. Then the first and deeper pages of
+the ranked feed are timed next to the chronological feed::
+
+    python manage.py seed --users 20000 --articles 1000000
+    python -m benchmarks.ranked_feed --authors 10000 --requests 50
+
+It runs against the configured database; set ``BLOG_SQLITE=1`` to use the
+local SQLite file instead of Postgres. Everything happens in a transaction
+that is rolled back at the end, so runs are repeatable.
+"""
+
+import argparse
+import logging
+import os
+import random
+import statistics
+import time
+
+import django
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, latencies, queries=None):
+    print(
+        f"{name:<28}"
+        f" {statistics.median(latencies) * 1000:>9.2f}"
+        f" {percentile(latencies, 0.99) * 1000:>9.2f}"
+        f" {statistics.median(queries) if queries else '':>8}"
+    )
+
+
+def fetch(client, path, token):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    with CaptureQueriesContext(connection) as captured:
+        started = time.perf_counter()
+        response = client.get(
+            path, HTTP_HOST="localhost", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        elapsed = time.perf_counter() - started
+    assert response.status_code == 200, (path, response.status_code)
+    return response.json(), elapsed, len(captured)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--authors", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--pages", type=int, default=10, help="depth of deep pages")
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument(
+        "--read-fraction",
+        type=float,
+        default=0.05,
+        help="Share of the feed the reader reads before the timing.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+    django.setup()
+    # Per-request timing logs would drown the report.
+    logging.getLogger("blog.requests").setLevel(logging.WARNING)
+    from django.contrib.auth.models import User
+    from django.db import connection, transaction
+    from django.test import Client
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from articles import receipts
+    from articles.models import FeedEntry
+    from users import subscriptions
+
+    rng = random.Random(args.seed)
+    client = Client()
+    with transaction.atomic():
+        reader = User.objects.create_user(username="ranked_feed_benchmark")
+        token = str(AccessToken.for_user(reader))
+        author_ids = list(
+            User.objects.exclude(pk=reader.pk)
+            .order_by("?")
+            .values_list("pk", flat=True)[: args.authors]
+        )
+        started = time.perf_counter()
+        for index in range(0, len(author_ids), 1000):
+            subscriptions.subscribe(reader, author_ids[index : index + 1000])
+        entries = FeedEntry.objects.filter(subscriber=reader).count()
+        print(
+            f"{connection.vendor}, {len(author_ids)} followed authors, "
+            f"{entries} feed entries in {time.perf_counter() - started:.1f} s"
+        )
+
+        article_ids = list(
+            FeedEntry.objects.filter(subscriber=reader).values_list(
+                "article_id", flat=True
+            )
+        )
+        read = rng.sample(article_ids, int(len(article_ids) * args.read_fraction))
+        latencies = []
+        for index in range(0, len(read), 100):
+            started = time.perf_counter()
+            receipts.mark_read(reader, read[index : index + 100])
+            latencies.append(time.perf_counter() - started)
+
+        print(f"{'case':<28} {'p50 ms':>9} {'p99 ms':>9} {'queries':>8}")
+        if latencies:
+            report(f"mark read, 100 ({len(read)})", latencies)
+        for name, query in (
+            ("feed", ""),
+            ("feed ranked", "&ordering=-score"),
+        ):
+            path = f"/api/articles/feed/?page_size={args.page_size}{query}"
+            first, deep, counts = [], [], []
+            for _ in range(args.requests):
+                data, elapsed, count = fetch(client, path, token)
+                first.append(elapsed)
+                counts.append(count)
+            report(name, first, counts)
+            # The same walk every time, timing the pages after the first.
+            for _ in range(max(1, args.requests // args.pages)):
+                data, _, _ = fetch(client, path, token)
+                for _ in range(args.pages - 1):
+                    if not data["next"]:
+                        break
+                    data, elapsed, _ = fetch(client, data["next"], token)
+                    deep.append(elapsed)
+            if deep:
+                report(f"{name}, pages 2-{args.pages}", deep)
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
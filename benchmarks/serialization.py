@@ -0,0 +1,73 @@
+"""Compare the serializer and ``.values()`` paths of the list endpoints.
+
+Each endpoint is called in-process with 100-item pages, once through the
+``ModelSerializer`` + ``JSONRenderer`` path and once through the
+``.values()`` + orjson path, and the bodies are checked to be identical::
+
+    python -m benchmarks.serialization --iterations 200
+
+The database needs at least a page of articles and users, for example
+from a copy of production data.
+"""
+
+import argparse
+import logging
+import os
+import statistics
+import time
+
+import django
+
+
+def measure(client, url, iterations):
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        response = client.get(url, HTTP_HOST="localhost")
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.status_code
+    return latencies, response.content
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(name, latencies):
+    print(
+        f"{name:<28} p50 {statistics.median(latencies) * 1000:>8.2f} ms"
+        f"  p99 {percentile(latencies, 0.99) * 1000:>8.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "blog.settings")
+    django.setup()
+    # Per-request timing logs would drown the report.
+    logging.getLogger("blog.requests").setLevel(logging.WARNING)
+    from django.test import Client, override_settings
+
+    client = Client()
+    urls = {
+        "articles": f"/api/articles/?page_size={args.page_size}",
+        "users (compact)": "/api/users/profile/?compact=1",
+    }
+    for name, url in urls.items():
+        with override_settings(ARTICLES_CACHE_TIMEOUT=0):
+            with override_settings(FAST_LIST_SERIALIZATION=False):
+                slow, slow_content = measure(client, url, args.iterations)
+            with override_settings(FAST_LIST_SERIALIZATION=True):
+                fast, fast_content = measure(client, url, args.iterations)
+        assert slow_content == fast_content, f"{name}: outputs differ"
+        report(f"{name} serializer", slow)
+        report(f"{name} values", fast)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import secrets
+
+from django.conf import settings
+from django.core import checks
+
+# Backends whose entries are invisible to other processes.
+LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_shared(alias="default"):
+    """Whether all processes see the same entries in cache ``alias``."""
+    return settings.CACHES[alias]["BACKEND"] not in LOCAL_BACKENDS
+
+
+def read_counter(cache, key):
+    """Read a persistent counter, starting it at a random value if missing.
+
+    A counter that was evicted restarts far from its old values, so a
+    reader comparing it to a value it saw earlier notices the change.
+    """
+    cache.add(key, secrets.randbits(62), None)
+    return cache.get(key)
+
+
+def incr_counter(cache, key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        read_counter(cache, key)
+        return cache.incr(key)
+
+
+def shared_cache_features():
+    """Enabled features that break when workers do not share the cache."""
+    features = []
+    if getattr(settings, "ARTICLES_CACHE_TIMEOUT", 60) > 0:
+        features.append("the article response cache")
+    features.append("token revocation")
+    if getattr(settings, "DATABASE_REPLICAS", []):
+        features.append("replica routing")
+    return features
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Fail when the cache is per process, unless that was opted into."""
+    if is_shared():
+        return []
+    if getattr(settings, "CACHE_LOCAL_ALLOWED", False):
+        level, check_id = checks.Warning, "blog.W001"
+    else:
+        level, check_id = checks.Error, "blog.E001"
+    return [
+        level(
+            "The default cache is local to each process; these need a shared "
+            f"one: {', '.join(shared_cache_features())}.",
+            hint="Configure a shared backend such as Redis (REDIS_URL).",
+            id=check_id,
+        )
+    ]
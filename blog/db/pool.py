@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+
+from django.db import OperationalError
+
+from blog import metrics
+
+
+class ConnectionPool:
+    """Bounded per-process pool of open database connections.
+
+    At most ``size`` connections are handed out at once; ``acquire`` waits
+    up to ``timeout`` seconds for one to be released before it fails. Idle
+    connections are reused most recently released first, so surplus ones
+    stay idle and can time out on the server side without harm.
+    """
+
+    def __init__(self, size, timeout):
+        self.size = size
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(size)
+        self.lock = threading.Lock()
+        self.idle = []
+        self.pid = os.getpid()
+
+    def acquire(self, connect, check=None):
+        """An idle connection passing ``check``, or a new one from ``connect``."""
+        started = time.perf_counter()
+        if not self.slots.acquire(timeout=self.timeout):
+            metrics.incr("db.pool.timeouts")
+            raise OperationalError(
+                f"No database connection was released within {self.timeout}s "
+                f"(pool size {self.size})."
+            )
+        metrics.timing("db.pool.wait_ms", (time.perf_counter() - started) * 1000)
+        try:
+            while True:
+                with self.lock:
+                    connection = self.idle.pop() if self.idle else None
+                if connection is None:
+                    break
+                if check is None or check(connection):
+                    metrics.incr("db.pool.reused")
+                    return connection
+                metrics.incr("db.pool.discarded")
+                self.discard(connection)
+            connection = connect()
+        except BaseException:
+            self.slots.release()
+            raise
+        metrics.incr("db.pool.opened")
+        return connection
+
+    def release(self, connection, reusable=True):
+        """Give back an acquired connection; it is closed unless ``reusable``."""
+        try:
+            if reusable:
+                with self.lock:
+                    self.idle.append(connection)
+            else:
+                metrics.incr("db.pool.discarded")
+                self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        """Close the idle connections; those in use are closed on release."""
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            self.discard(connection)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, size, timeout):
+    """The pool of ``alias`` in this process.
+
+    A forked worker must not share the sockets of its parent, so it gets a
+    pool of its own and leaves the inherited connections alone.
+    """
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = _pools[alias] = ConnectionPool(size, timeout)
+        return pool
@@ -0,0 +1,84 @@
+"""PostgreSQL backend with connection metrics and optional pooling.
+
+Set ``"POOL": {"SIZE": n, "TIMEOUT": seconds}`` in a ``DATABASES`` entry
+to hand out connections from a per-process pool instead of opening one
+per thread; closing a connection then returns it to the pool.
+"""
+
+import time
+
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.postgresql import base
+from django.dispatch import receiver
+
+from blog import metrics
+from blog.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_pool(self):
+        options = self.settings_dict.get("POOL") or {}
+        if not options.get("SIZE"):
+            return None
+        return get_pool(self.alias, options["SIZE"], options.get("TIMEOUT", 10))
+
+    def open_connection(self, conn_params):
+        started = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        metrics.timing("db.connect_ms", (time.perf_counter() - started) * 1000)
+        metrics.incr("db.connections.opened")
+        return connection
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool()
+        if pool is None:
+            return self.open_connection(conn_params)
+        connection = pool.acquire(
+            lambda: self.open_connection(conn_params), check=self.is_pooled_usable
+        )
+        # Set by get_new_connection() for the connections it opens.
+        self.isolation_level = self.settings_dict["OPTIONS"].get(
+            "isolation_level", connection.isolation_level
+        )
+        return connection
+
+    def is_pooled_usable(self, connection):
+        if connection.closed:
+            return False
+        if not self.settings_dict["CONN_HEALTH_CHECKS"]:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        except base.Database.Error:
+            return False
+        return True
+
+    def _close(self):
+        pool = self.get_pool()
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection = self.connection
+        # A connection closed inside atomic() stays referenced by this
+        # wrapper until the block exits, so it must not be handed out.
+        reusable = not (
+            connection.closed or self.errors_occurred or self.in_atomic_block
+        )
+        with self.wrap_database_errors:
+            try:
+                if reusable:
+                    connection.rollback()
+            except base.Database.Error:
+                reusable = False
+                raise
+            finally:
+                pool.release(connection, reusable)
+
+
+@receiver(request_started)
+def count_reused_connections(**kwargs):
+    # Runs after close_old_connections(), so what is still open is reused.
+    for connection in connections.all(initialized_only=True):
+        if isinstance(connection, DatabaseWrapper) and connection.connection:
+            metrics.incr("db.connections.reused")
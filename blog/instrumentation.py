@@ -0,0 +1,145 @@
+import json
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("blog.requests")
+
+
+class RequestTimings:
+    """Query count and time spent per phase while serving one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        # Installed as a database execute wrapper.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    def add(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+
+def get_timings(request):
+    """Timings of ``request`` (a Django or DRF request), if it is measured."""
+    return getattr(getattr(request, "_request", request), "timings", None)
+
+
+@contextmanager
+def timed(request, phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings = get_timings(request)
+        if timings is not None:
+            timings.add(phase, time.perf_counter() - started)
+
+
+class TimedSerializerMixin:
+    """Count the time serializers spend building representations."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            with timed(self.request, "serialize"):
+                return to_representation(instance)
+
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+
+class RequestTimingMiddleware:
+    """Measure queries, DB time, serialization and rendering per request.
+
+    Timings are logged as one JSON object per request to the
+    ``blog.requests`` logger and, when ``REQUEST_TIMING_HEADER`` is on,
+    sent back in a ``Server-Timing`` header.
+
+    Under ASGI, queries are counted on the connections of the thread that
+    runs the request's thread-sensitive sync code, where Django runs ORM
+    calls of async views.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.timings = timings = RequestTimings()
+        started = time.perf_counter()
+        with self.measure_queries(timings):
+            response = self.get_response(request)
+        return self.finish(request, response, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        request.timings = timings = RequestTimings()
+        started = time.perf_counter()
+        stack = await sync_to_async(self.measure_queries)(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, time.perf_counter() - started)
+
+    def measure_queries(self, timings):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings))
+        return stack
+
+    def finish(self, request, response, total):
+        timings = request.timings
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": timings.queries,
+            "db_ms": round(timings.db * 1000, 2),
+            **{
+                f"{phase}_ms": round(seconds * 1000, 2)
+                for phase, seconds in timings.phases.items()
+            },
+            "total_ms": round(total * 1000, 2),
+        }
+        logger.info(json.dumps(record))
+        if getattr(settings, "REQUEST_TIMING_HEADER", settings.DEBUG):
+            metrics = [
+                f'db;dur={timings.db * 1000:.2f};desc="{timings.queries} queries"'
+            ]
+            metrics += [
+                f"{phase};dur={seconds * 1000:.2f}"
+                for phase, seconds in timings.phases.items()
+            ]
+            metrics.append(f"total;dur={total * 1000:.2f}")
+            response["Server-Timing"] = ", ".join(metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called for DRF responses between the view and rendering.
+        started = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered: request.timings.add(
+                "render", time.perf_counter() - started
+            )
+        )
+        return response
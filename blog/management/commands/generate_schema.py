@@ -0,0 +1,50 @@
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+FORMATS = (".json", ".yaml", "openapi")
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the OpenAPI documents into API_SCHEMA_CACHE_DIR, so servers "
+        "running the same code serve them without generating them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            default=settings.API_SCHEMA_URL,
+            help="Base URL clients fetch the schema from; defaults to "
+            "API_SCHEMA_URL.",
+        )
+        parser.add_argument(
+            "--format",
+            action="append",
+            choices=FORMATS,
+            dest="formats",
+            help="Document to generate, repeatable; defaults to all of them.",
+        )
+
+    def handle(self, *args, url, formats, **options):
+        if not settings.API_SCHEMA_CACHE_DIR:
+            raise CommandError("API_SCHEMA_CACHE_DIR is not set.")
+        if not url:
+            raise CommandError("Pass --url or set API_SCHEMA_URL.")
+        parts = urlsplit(url)
+        factory = RequestFactory(HTTP_HOST=parts.netloc)
+        for format in formats or FORMATS:
+            if format == "openapi":
+                # The document the swagger and redoc pages load.
+                path = reverse("schema-swagger-ui") + "?format=openapi"
+            else:
+                path = reverse("schema-json", kwargs={"format": format})
+            match = resolve(path.split("?")[0])
+            request = factory.get(path, secure=parts.scheme == "https")
+            response = match.func(request, *match.args, **match.kwargs)
+            if response.status_code != 200:
+                raise CommandError(f"{path}: HTTP {response.status_code}")
+            self.stdout.write(f"{path}: {len(response.content)} bytes")
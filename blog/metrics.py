@@ -0,0 +1,66 @@
+import threading
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_timings = {}
+
+# Only the most recent samples are kept per timing, which bounds memory
+# while still giving usable percentiles.
+MAX_SAMPLES = 1024
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def gauge(name, value):
+    with _lock:
+        _gauges[name] = value
+
+
+def timing(name, value):
+    """Record a duration in milliseconds."""
+    with _lock:
+        samples = _timings.setdefault(name, [])
+        samples.append(value)
+        if len(samples) > MAX_SAMPLES:
+            del samples[: len(samples) - MAX_SAMPLES]
+
+
+def percentile(sorted_samples, fraction):
+    index = min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))
+    return sorted_samples[index]
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": percentile(ordered, 0.5),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1],
+    }
+
+
+def snapshot():
+    """Current counters, gauges and timing percentiles of this process."""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timings = {name: list(samples) for name, samples in _timings.items()}
+    return {
+        "counters": counters,
+        "gauges": gauges,
+        "timings": {
+            name: summarize(samples) for name, samples in timings.items() if samples
+        },
+    }
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _timings.clear()
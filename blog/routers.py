@@ -0,0 +1,128 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from blog import metrics
+
+PRIMARY = "default"
+
+
+class RequestRouting:
+    """Where the current request reads from, and whether it wrote."""
+
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+
+
+routing = ContextVar("routing", default=None)
+
+
+def replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def stickiness():
+    return getattr(settings, "DATABASE_PRIMARY_STICKINESS", 5)
+
+
+def pin_key(user_id):
+    return f"db:primary:{user_id}"
+
+
+def pin_to_primary(user):
+    """Send ``user``'s reads to the primary until replicas caught up."""
+    cache.set(pin_key(user.id), 1, stickiness())
+    metrics.incr("db.primary_pins")
+
+
+def is_pinned(user):
+    return user.is_authenticated and cache.get(pin_key(user.id)) is not None
+
+
+class PrimaryReplicaRouter:
+    """Send reads of requests marked by ``ReplicaReadMixin`` to a replica.
+
+    Everything else, including every write and any read after a write in
+    the same request, uses the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = routing.get()
+        if state is not None and state.replica and not state.wrote:
+            return state.replica
+        return PRIMARY
+
+    def db_for_write(self, model, **hints):
+        state = routing.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+
+class ReplicaRoutingMiddleware:
+    """Track database use per request and pin users who wrote.
+
+    DRF sets the authenticated user on the Django request, so it is known
+    here once the view returns.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RequestRouting()
+        token = routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            routing.reset(token)
+        self.pin_writer(request, state)
+        return response
+
+    async def __acall__(self, request):
+        state = RequestRouting()
+        token = routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            routing.reset(token)
+        # A lazy request.user may load the session.
+        await sync_to_async(self.pin_writer)(request, state)
+        return response
+
+    def pin_writer(self, request, state):
+        user = getattr(request, "user", None)
+        if state.wrote and replicas() and user is not None and user.is_authenticated:
+            pin_to_primary(user)
+
+
+class ReplicaReadMixin:
+    """Serve safe requests from a replica unless the user recently wrote."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        state = routing.get()
+        if (
+            state is not None
+            and replicas()
+            and request.method in SAFE_METHODS
+            and not is_pinned(request.user)
+        ):
+            state.replica = random.choice(replicas())
+            metrics.incr("db.replica_requests")
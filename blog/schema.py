@@ -0,0 +1,180 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+
+import drf_yasg
+import rest_framework
+from django.apps import apps
+from django.conf import settings
+from django.http import HttpResponse
+from django.http.request import split_domain_port
+from django.utils.cache import get_conditional_response
+from drf_yasg.renderers import _SpecRenderer
+
+
+@lru_cache(maxsize=None)
+def fingerprint():
+    """Identifies the code the schema is generated from.
+
+    ``API_SCHEMA_FINGERPRINT``, such as a release or commit id, is used
+    when set; otherwise the project's Python sources are hashed.
+    """
+    configured = getattr(settings, "API_SCHEMA_FINGERPRINT", None)
+    if configured:
+        return str(configured)
+    digest = hashlib.sha1(f"{drf_yasg.__version__}|{rest_framework.VERSION}".encode())
+    base_dir = Path(settings.BASE_DIR).resolve()
+    roots = {base_dir / settings.ROOT_URLCONF.split(".")[0]}
+    roots.update(
+        Path(config.path).resolve()
+        for config in apps.get_app_configs()
+        if Path(config.path).resolve().is_relative_to(base_dir)
+    )
+    for root in sorted(roots):
+        for path in sorted(root.rglob("*.py")):
+            digest.update(str(path.relative_to(base_dir)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def cache_size():
+    return getattr(settings, "API_SCHEMA_CACHE_SIZE", 16)
+
+
+def schema_host(request):
+    """``scheme://host`` of ``request`` if documents for it may be cached.
+
+    ``get_host`` only admits hosts matching ``ALLOWED_HOSTS``, but wildcard
+    entries match any number of names. Only hosts listed exactly are
+    cached, so made-up Host headers cannot add documents.
+    """
+    domain, port = split_domain_port(request.get_host())
+    listed = {host.lower().rstrip(".") for host in settings.ALLOWED_HOSTS}
+    if domain not in listed:
+        return None
+    host = f"{domain}:{port}" if port else domain
+    return f"{request.scheme}://{host}"
+
+
+class SchemaCache:
+    """Rendered schema documents in memory, backed by ``API_SCHEMA_CACHE_DIR``.
+
+    Keys include the code fingerprint, so a deploy with other code never
+    serves a stale document. Both stores keep the ``API_SCHEMA_CACHE_SIZE``
+    most recently used documents; files of old deploys are removed as
+    new ones are written.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.documents = OrderedDict()
+
+    def key(self, base_url, version, format):
+        return hashlib.sha1(
+            "|".join((fingerprint(), base_url, version, format)).encode()
+        ).hexdigest()
+
+    def directory(self):
+        directory = getattr(settings, "API_SCHEMA_CACHE_DIR", None)
+        return Path(directory) if directory else None
+
+    def path(self, key):
+        directory = self.directory()
+        return directory / f"schema-{key}" if directory else None
+
+    def get(self, key):
+        with self.lock:
+            content = self.documents.get(key)
+            if content is not None:
+                self.documents.move_to_end(key)
+                return content
+        path = self.path(key)
+        if path is not None and path.exists():
+            content = path.read_bytes()
+            self.remember(key, content)
+        return content
+
+    def set(self, key, content):
+        self.remember(key, content)
+        path = self.path(key)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Write then rename so other processes never read half a file.
+            partial = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+            partial.write_bytes(content)
+            partial.replace(path)
+            self.prune_files()
+
+    def remember(self, key, content):
+        with self.lock:
+            self.documents[key] = content
+            self.documents.move_to_end(key)
+            while len(self.documents) > cache_size():
+                self.documents.popitem(last=False)
+
+    def prune_files(self):
+        """Remove all but the most recently written ``cache_size()`` files."""
+        files = []
+        for path in self.directory().glob("schema-*"):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except FileNotFoundError:
+                pass
+        files.sort(reverse=True)
+        for _, path in files[cache_size() :]:
+            if path.suffix != ".tmp":
+                path.unlink(missing_ok=True)
+
+    def clear(self):
+        with self.lock:
+            self.documents.clear()
+
+
+schema_cache = SchemaCache()
+
+
+class CachedSchemaMixin:
+    """Generate each JSON/YAML schema document once and serve it with an ETag.
+
+    The documents depend on the scheme and host the schema is served from,
+    unless the view has a fixed ``url``; see ``schema_host``. The UI pages
+    are cheap, they fetch the document separately, and are rendered as
+    before.
+    """
+
+    def get(self, request, version="", format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer) or not self.public:
+            return super().get(request, version, format)
+
+        base_url = self.url or schema_host(request)
+        if base_url is None:
+            return super().get(request, version, format)
+        key = schema_cache.key(
+            base_url, request.version or version or "", renderer.format
+        )
+        etag = f'"{key}"'
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            not_modified["ETag"] = etag
+            return not_modified
+
+        content = schema_cache.get(key)
+        if content is None:
+            response = super().get(request, version, format)
+            content = renderer.render(
+                response.data, renderer.media_type, self.get_renderer_context()
+            )
+            schema_cache.set(key, content)
+        response = HttpResponse(
+            content, content_type=f"{renderer.media_type}; charset={renderer.charset}"
+        )
+        response["ETag"] = etag
+        return response
+
+
+def cached_schema_view(schema_view, url=None):
+    """Subclass of a ``get_schema_view`` class serving cached documents."""
+    return type("CachedSchemaView", (CachedSchemaMixin, schema_view), {"url": url})
@@ -0,0 +1,228 @@
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+from blog.instrumentation import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+datetime_field = serializers.DateTimeField()
+ZERO = timedelta(0)
+
+
+def is_utc(tz):
+    return tz is dt_timezone.utc or getattr(tz, "key", None) == "UTC"
+
+
+def format_utc_datetime(value):
+    if isinstance(value, datetime) and value.utcoffset() == ZERO:
+        return value.isoformat()[:-6] + "Z"
+    return datetime_field.to_representation(value)
+
+
+def datetime_formatter():
+    """Function rendering datetimes exactly like a serializer ``DateTimeField``.
+
+    When the output timezone is UTC, UTC values, which is what the database
+    returns, skip the timezone conversion that dominates ``DateTimeField``.
+    """
+    if (
+        settings.USE_TZ
+        and api_settings.DATETIME_FORMAT == ISO_8601
+        and is_utc(timezone.get_current_timezone())
+    ):
+        return format_utc_datetime
+    return datetime_field.to_representation
+
+
+def has_float(data):
+    if isinstance(data, float):
+        return True
+    if isinstance(data, dict):
+        return any(has_float(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_float(value) for value in data)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """``JSONRenderer`` that encodes with orjson when the output is the same.
+
+    Indented or ASCII-only output, floats (orjson spells exponents and NaN
+    differently) and anything orjson cannot encode, such
+    as non-string keys, fall back to the standard renderer. Dates and other
+    extra types go through the DRF encoder.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.get_indent(accepted_media_type or "", renderer_context or {})
+            or self.ensure_ascii
+            or has_float(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data,
+                default=encoders.JSONEncoder().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escapes as JSONRenderer, for JavaScript compatibility.
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+def fast_lists():
+    return getattr(settings, "FAST_LIST_SERIALIZATION", False)
+
+
+class ValuesListMixin:
+    """Serve read-only list actions from ``.values()`` rows.
+
+    Views list the columns to fetch in ``values_fields`` and turn each row
+    into the serializer's representation in ``to_representation_rows``.
+    The rendered JSON is byte-identical to the serializer path, which is
+    still used for other renderers and when ``FAST_LIST_SERIALIZATION``
+    is off. The flag also switches JSON rendering to ``ORJSONRenderer``;
+    otherwise the view keeps the default renderers.
+    """
+
+    fast_renderer_classes = [ORJSONRenderer, BrowsableAPIRenderer]
+    values_actions = ("list",)
+    values_fields = ()
+
+    def get_renderers(self):
+        if not fast_lists():
+            return super().get_renderers()
+        return [renderer() for renderer in self.fast_renderer_classes]
+
+    def get_values_fields(self):
+        return self.values_fields
+
+    def use_values_list(self):
+        return (
+            self.action in self.values_actions
+            and fast_lists()
+            and self.request.accepted_renderer.format == "json"
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_values_list():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        # Annotations are kept so a cursor can be built from the row.
+        queryset = queryset.prefetch_related(None).values(
+            *self.get_values_fields(), *queryset.query.annotations
+        )
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        with timed(self.request, "serialize"):
+            data = self.to_representation_rows(rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def to_representation_rows(self, rows):
+        raise NotImplementedError
+
+
+def split_names(value):
+    return [name for name in (part.strip() for part in value.split(",")) if name]
+
+
+class SparseFieldsetMixin:
+    """Let read requests pick fields with ``?fields=a,b`` or ``?omit=a,b``.
+
+    The other fields are dropped from the serializer and from the SQL
+    select list. ``sparse_columns`` maps a field to the model fields it
+    reads: by default the one of the same name, none (``()``) for computed
+    fields. ``sparse_required`` columns are always loaded, for instance
+    the ones pagination reads.
+    """
+
+    sparse_actions = ("list", "retrieve")
+    sparse_columns = {}
+    sparse_required = ("id",)
+
+    def get_fieldset(self):
+        """Names of the requested fields in serializer order, or None for all."""
+        if not hasattr(self, "_fieldset"):
+            self._fieldset = self.parse_fieldset()
+        return self._fieldset
+
+    def parse_fieldset(self):
+        params = self.request.query_params
+        if self.action not in self.sparse_actions or not (
+            "fields" in params or "omit" in params
+        ):
+            return None
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        available = [
+            name for name, field in serializer.fields.items() if not field.write_only
+        ]
+        requested = split_names(params["fields"]) if "fields" in params else available
+        omitted = split_names(params.get("omit", ""))
+        unknown = [name for name in [*requested, *omitted] if name not in available]
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": [f"Unknown fields: {', '.join(unknown)}."]}
+            )
+        fieldset = [
+            name for name in available if name in requested and name not in omitted
+        ]
+        if not fieldset:
+            raise serializers.ValidationError({"fields": ["No fields selected."]})
+        return fieldset
+
+    def wants_field(self, name):
+        fieldset = self.get_fieldset()
+        return fieldset is None or name in fieldset
+
+    def get_fieldset_columns(self):
+        fieldset = self.get_fieldset()
+        if fieldset is None:
+            return None
+        columns = dict.fromkeys(self.sparse_required)
+        for name in fieldset:
+            columns.update(dict.fromkeys(self.sparse_columns.get(name, (name,))))
+        return list(columns)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        columns = self.get_fieldset_columns()
+        if columns is not None:
+            queryset = queryset.only(*columns)
+        return queryset
+
+    def get_values_fields(self):
+        values_fields = super().get_values_fields()
+        columns = self.get_fieldset_columns()
+        if columns is None:
+            return values_fields
+        return [name for name in values_fields if name in columns]
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            fields = getattr(serializer, "child", serializer).fields
+            for name in list(fields):
+                if name not in fieldset:
+                    fields.pop(name)
+        return serializer
@@ -9,6 +9,7 @@ https://docs.djangoproject.com/en/4.1/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.1/ref/settings/
 """
+import os
 from datetime import timedelta
 from pathlib import Path
 
@@ -42,9 +43,12 @@ INSTALLED_APPS = [
     "articles",
     "users",
     "django_filters",
+    "blog",
 ]
 
 MIDDLEWARE = [
+    "blog.instrumentation.RequestTimingMiddleware",
+    "blog.routers.ReplicaRoutingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,15 +82,81 @@ WSGI_APPLICATION = "blog.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/4.1/ref/settings/#databases
 
+# Connections persist for DB_CONN_MAX_AGE seconds and are health-checked
+# before reuse, which saves the TCP, TLS and auth round trips per request.
+# DB_POOL_SIZE > 0 instead hands connections out of a per-process pool of
+# that size, waiting up to DB_POOL_TIMEOUT seconds for a free one; use it
+# under ASGI, where per-thread persistent connections are not reused.
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 0))
+
 DATABASES = {
     "default": {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'blog.db.postgresql',
         'NAME': 'postgres',
         'USER': 'postgres',
         'PASSWORD': 'postgres',
         'HOST': 'localhost',
         'PORT': '5432',
+        "CONN_MAX_AGE": (
+            0 if DB_POOL_SIZE else int(os.environ.get("DB_CONN_MAX_AGE", 60))
+        ),
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {"connect_timeout": int(os.environ.get("DB_CONNECT_TIMEOUT", 5))},
+        "POOL": {
+            "SIZE": DB_POOL_SIZE,
+            "TIMEOUT": float(os.environ.get("DB_POOL_TIMEOUT", 10)),
+        },
+}
+    }
+
+# BLOG_SQLITE=1 uses a local SQLite file instead, e.g. to run the seed
+# command and the benchmarks without Postgres.
+if os.environ.get("BLOG_SQLITE"):
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.sqlite3",
+        },
+        # Stands in for a replica in tests; not routed to unless listed
+        # in DATABASE_REPLICAS.
+        "replica": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": BASE_DIR / "db.replica.sqlite3",
+        },
+    }
+
+# Safe requests of the article and user viewsets read from one of these
+# DATABASES aliases. For DATABASE_PRIMARY_STICKINESS seconds after a
+# write, the writer's reads stay on the primary so they see their own
+# changes; the pins live in the default cache, which must be shared by
+# all processes for that.
+DATABASE_ROUTERS = ["blog.routers.PrimaryReplicaRouter"]
+DATABASE_REPLICAS = []
+DATABASE_PRIMARY_STICKINESS = 5
+if os.environ.get("DATABASE_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DATABASE_REPLICA_HOST"],
+    }
+    DATABASE_REPLICAS = ["replica"]
+
+# Article cache versions, token revocations, blacklist writes and primary
+# pins must be seen by every worker process. The default cache is in
+# process memory, which is only right for a single process (the caches
+# system check warns about it); set REDIS_URL to share a Redis cache,
+# which needs the redis package installed.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
 }
+CACHE_LOCAL_ALLOWED = True
+if os.environ.get("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["REDIS_URL"],
+        }
     }
 
 # Password validation
@@ -132,7 +202,7 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.ClaimsJWTAuthentication",
     ),
     # 'DEFAULT_RENDERER_CLASSES': (
     #     'rest_framework.renderers.JSONRenderer',
@@ -172,3 +242,102 @@ SWAGGER_SETTINGS = {
 }
 # add this line
 CORS_ALLOW_ALL_ORIGINS = True
+
+# The OpenAPI documents are generated once per code fingerprint (a hash of
+# the sources unless API_SCHEMA_FINGERPRINT is set) and host, then
+# served from memory and, when set, API_SCHEMA_CACHE_DIR; see
+# "manage.py generate_schema". API_SCHEMA_URL fixes the documented host;
+# otherwise only hosts listed exactly in ALLOWED_HOSTS are cached. Each
+# store keeps the API_SCHEMA_CACHE_SIZE most recently used documents.
+API_SCHEMA_URL = os.environ.get("API_SCHEMA_URL")
+API_SCHEMA_FINGERPRINT = os.environ.get("API_SCHEMA_FINGERPRINT")
+API_SCHEMA_CACHE_DIR = os.environ.get("API_SCHEMA_CACHE_DIR")
+API_SCHEMA_CACHE_SIZE = 16
+
+# Authors with more subscribers than this are pulled at read time
+# instead of being fanned out into every subscriber's feed.
+FEED_FANOUT_MAX_SUBSCRIBERS = 10000
+FEED_BACKFILL_LIMIT = 500
+FEED_HOT_AUTHORS_TIMEOUT = 60
+# Ranked feed (?ordering=-score): an article loses half its weight every
+# FEED_RANK_HALF_LIFE seconds; each doubling of the subscriber's reads of
+# the author adds AFFINITY_WEIGHT half-lives, each doubling of the
+# article's reads POPULARITY_WEIGHT. Scores are stored, so run
+# "manage.py rebuild_feed_scores" after changing these. Article reads
+# are recounted, not counted per receipt: run "manage.py
+# rebuild_feed_scores --reads-only" periodically, e.g. every few minutes.
+FEED_RANK_HALF_LIFE = 6 * 3600
+FEED_RANK_AFFINITY_WEIGHT = 1.0
+FEED_RANK_POPULARITY_WEIGHT = 0.5
+
+# Queue feed delivery and unread counts of new articles and follows in
+# the outbox table instead of doing them in the request, so publishing
+# costs the same for any number of followers; "manage.py drain_outbox"
+# does the work. Failed events are retried after OUTBOX_RETRY_DELAY
+# seconds, doubling up to OUTBOX_RETRY_MAX_DELAY, OUTBOX_MAX_ATTEMPTS times.
+OUTBOX_ENABLED = bool(os.environ.get("OUTBOX_ENABLED"))
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_RETRY_DELAY = 1.0
+OUTBOX_RETRY_MAX_DELAY = 300
+
+# Claims-based JWT authentication: how long a user's token version and
+# full User row are trusted before they are re-read from the database.
+AUTH_TOKEN_VERSION_TIMEOUT = 60
+AUTH_FULL_USER_TIMEOUT = 30
+AUTH_FULL_USER_CACHE_SIZE = 1024
+# Refresh tokens: the in-process blacklist Bloom filter is rebuilt this
+# often; tokens blacklisted in between are checked in the database.
+AUTH_BLACKLIST_REBUILD_INTERVAL = 300
+AUTH_BLACKLIST_ERROR_RATE = 0.01
+
+# Anonymous article list/detail responses; 0 disables the cache.
+ARTICLES_CACHE_ALIAS = "default"
+ARTICLES_CACHE_TIMEOUT = 60
+ARTICLES_CACHE_LOCK_TIMEOUT = 10
+# Longest wait for a response another request is computing, after which
+# the request computes it too.
+ARTICLES_CACHE_WAIT = 0.5
+# Cached responses are compressed once per article version, so high
+# levels cost nothing per request. Brotli needs the brotli package.
+ARTICLES_CACHE_GZIP_LEVEL = 9
+ARTICLES_CACHE_BROTLI_QUALITY = 9
+
+# Rows per server-side cursor fetch of the NDJSON export and rows per
+# bulk_create batch of the import.
+ARTICLES_EXPORT_CHUNK_SIZE = 2000
+ARTICLES_IMPORT_BATCH_SIZE = 1000
+
+# Acknowledge read receipts at once and write them in coalesced batch
+# upserts when this many are buffered, every interval (seconds; 0 turns
+# the background flusher off) and at shutdown. While a failing database
+# keeps this many buffered, new receipts are written at once.
+READ_RECEIPTS_WRITE_BEHIND = False
+READ_RECEIPTS_BUFFER_SIZE = 1000
+READ_RECEIPTS_BUFFER_LIMIT = 10000
+READ_RECEIPTS_FLUSH_INTERVAL = 1.0
+
+# Serve read-only list actions from .values() rows rendered with orjson.
+# Opt-in per deployment.
+FAST_LIST_SERIALIZATION = False
+
+# Per-request query counts and timings are logged to "blog.requests";
+# the Server-Timing header exposes them to clients, so only in DEBUG.
+REQUEST_TIMING_HEADER = DEBUG
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "require_debug_true": {"()": "django.utils.log.RequireDebugTrue"},
+    },
+    "handlers": {
+        "requests": {
+            "class": "logging.StreamHandler",
+            "filters": ["require_debug_true"],
+        },
+    },
+    "loggers": {
+        "blog.requests": {"handlers": ["requests"], "level": "INFO"},
+    },
+}
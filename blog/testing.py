@@ -0,0 +1,41 @@
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Test case helpers that fail when a request exceeds its query budget.
+
+    Queries are counted on every database the test case may use, so reads
+    routed to a replica count as well.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, budget, label="block"):
+        queries = []
+        with ExitStack() as stack:
+            captures = {
+                alias: stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in sorted(getattr(self, "databases", connections))
+            }
+            yield queries
+        for alias, captured in captures.items():
+            queries.extend(
+                dict(query, alias=alias) for query in captured.captured_queries
+            )
+        if len(queries) > budget:
+            listing = "\n".join(
+                f"{index}. [{query['alias']}] {query['sql']}"
+                for index, query in enumerate(queries, 1)
+            )
+            self.fail(
+                f"{label} ran {len(queries)} queries, budget is {budget}:\n{listing}"
+            )
+
+    def assertQueryBudgets(self, budgets, request):
+        """Call ``request(url)`` for every URL of a ``{url: budget}`` mapping."""
+        for url, budget in budgets.items():
+            with self.subTest(url=url):
+                with self.assertQueryBudget(budget, url):
+                    request(url)
@@ -13,20 +13,28 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path, re_path
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
 from rest_framework import permissions
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Blog API",
-        default_version="v1",
-        description="Test description",
+from blog.schema import cached_schema_view
+from blog.views import metrics_view
+
+schema_view = cached_schema_view(
+    get_schema_view(
+        openapi.Info(
+            title="Blog API",
+            default_version="v1",
+            description="Test description",
+        ),
+        url=settings.API_SCHEMA_URL,
+        public=True,
+        permission_classes=[permissions.AllowAny],
     ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
+    url=settings.API_SCHEMA_URL,
 )
 
 urlpatterns = [
@@ -34,6 +42,7 @@ urlpatterns = [
     # path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
     path("api/articles/", include("articles.urls")),
     path("api/users/", include("users.urls")),
+    path("api/metrics/", metrics_view, name="metrics"),
     re_path(
         r"^swagger(?P<format>\.json|\.yaml)$",
         schema_view.without_ui(cache_timeout=0),
@@ -0,0 +1,14 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from blog import metrics
+from users.blacklist import record_table_sizes
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics_view(request):
+    """Metrics of the process that serves the request."""
+    record_table_sizes()
+    return Response(metrics.snapshot())
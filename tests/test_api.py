@@ -1,20 +1,55 @@
+import gzip
 import json
+import os
+import sqlite3
+import threading
+from base64 import urlsafe_b64encode
+from io import StringIO
+from tempfile import TemporaryDirectory
+from unittest import skipUnless
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Count, Q
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.db.models import Count, F
+from django.test import SimpleTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework.views import status
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-from articles.models import Article, ReadArticle
+from articles import cache as article_cache
+from articles import outbox
+from articles import ranking
+from articles import writebehind
+from articles.feed import hot_author_ids, ranked_feed_queryset
+from articles.models import Article, FeedEntry, OutboxEvent, ReadArticle
+from articles.search import substring_search
 from articles.serializers import ArticleSerializer
-from users.models import SubscriptionUser
-from users.serializers import UserSerializer
+from blog import metrics
+from blog.caching import check_shared_cache
+from blog.db.pool import ConnectionPool
+from blog.schema import schema_cache
+from blog.serialization import ORJSONRenderer
+from blog.testing import QueryBudgetMixin
+from users.authentication import VERSION_CLAIM, revoke_tokens, token_version
+from users.blacklist import BloomFilter, blacklist_index, recent_key
+from users.models import Profile, SubscriptionUser
+from users.serializers import UserSerializer, UserTokenObtainPairSerializer
 
 
-class ArticlesApiTestCase(APITestCase):
+class ArticlesApiTestCase(QueryBudgetMixin, APITestCase):
     def setUp(self):
+        cache.clear()
         self.user_1 = User.objects.create_user(username="alex", password="wbblog")
         self.user_2 = User.objects.create_user(username="murfy", password="wbblog")
 
@@ -40,6 +75,178 @@ class ArticlesApiTestCase(APITestCase):
         self.assertEqual(3, Article.objects.all().count())
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_get_cursor_pages(self):
+        url = reverse("articles-list")
+        response = self.client.get(url, {"page_size": 2})
+        self.assertNotIn("count", response.data)
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_3.id, self.article_2.id], ids)
+        Article.objects.create(title="Test_article_4", body="hello_4", user=self.user_1)
+        response = self.client.get(response.data["next"])
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_1.id], ids)
+        self.assertIsNone(response.data["next"])
+        response = self.client.get(response.data["previous"])
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_3.id, self.article_2.id], ids)
+
+    def test_get_cursor_ordering(self):
+        url = reverse("articles-list")
+        response = self.client.get(url, {"page_size": 2, "ordering": "updated"})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_1.id, self.article_2.id], ids)
+        response = self.client.get(response.data["next"])
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_3.id], ids)
+        response = self.client.get(url, {"cursor": "garbage"})
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+        for tokens in (
+            {"f": "created", "d": 1, "p": ["abc", "x"]},
+            {"f": "created", "d": 1, "p": [{"dt": "2024-01-01T00:00:00+00:00"}, "x"]},
+            {"f": "created", "d": 1, "p": [[1], 1]},
+            {"f": "created", "d": 1, "p": [None, 1]},
+        ):
+            with self.subTest(tokens=tokens):
+                cursor = urlsafe_b64encode(json.dumps(tokens).encode()).decode()
+                response = self.client.get(url, {"cursor": cursor})
+                self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_get_page_number(self):
+        url = reverse("articles-list")
+        response = self.client.get(url, {"page": 1})
+        self.assertEqual(3, response.data["count"])
+        self.assertEqual(3, len(response.data["results"]))
+
+    def test_get_cached(self):
+        url = reverse("articles-detail", args=(self.article_1.id,))
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual("hello_1", response.json()["body"])
+        self.article_1.body = "updated"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article_1.save()
+        response = self.client.get(url)
+        self.assertEqual("updated", response.json()["body"])
+
+    def test_get_cache_invalidated_on_delete(self):
+        url = reverse("articles-list")
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article_1.delete()
+        response = self.client.get(url)
+        self.assertEqual(2, len(response.json()["results"]))
+
+    def test_get_cache_compressed_variants(self):
+        url = reverse("articles-list")
+        plain = self.client.get(url)
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        preferred = "br" if article_cache.brotli else "gzip"
+        for accept, encoding in (
+            ("gzip, deflate", "gzip"),
+            ("br;q=1.0, gzip;q=0.5", preferred),
+            ("gzip;q=0, identity", None),
+        ):
+            with self.subTest(accept=accept), self.assertNumQueries(0):
+                response = self.client.get(url, HTTP_ACCEPT_ENCODING=accept)
+            self.assertEqual(encoding, response.get("Content-Encoding"))
+            if encoding == "gzip":
+                self.assertEqual(plain.content, gzip.decompress(response.content))
+
+        # The request that fills the cache is compressed too, and a write
+        # replaces every variant.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article_1.delete()
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual("gzip", response["Content-Encoding"])
+        content = json.loads(gzip.decompress(response.content))
+        self.assertEqual(2, len(content["results"]))
+
+    @override_settings(ARTICLES_CACHE_WAIT=0.1)
+    def test_get_cache_single_recompute(self):
+        metrics.reset()
+        self.assertTrue(article_cache.acquire("key"))
+        self.assertFalse(article_cache.acquire("key"))
+        self.assertIsNone(article_cache.wait_for("key"))
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(1, counters["articles.cache.wait_timeouts"])
+        article_cache.get_cache().set("key", {"content": b"{}"})
+        self.assertEqual({"content": b"{}"}, article_cache.wait_for("key"))
+        article_cache.release("key")
+        self.assertTrue(article_cache.acquire("key"))
+
+    def test_unshared_cache_check(self):
+        local = {
+            "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+        }
+        with override_settings(CACHES=local, CACHE_LOCAL_ALLOWED=False):
+            self.assertEqual(["blog.E001"], [m.id for m in check_shared_cache(None)])
+        with override_settings(CACHES=local, CACHE_LOCAL_ALLOWED=True):
+            self.assertEqual(["blog.W001"], [m.id for m in check_shared_cache(None)])
+        shared = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        }
+        with override_settings(CACHES=shared):
+            self.assertEqual([], check_shared_cache(None))
+
+    def test_search(self):
+        self.article_2.body = "python release notes"
+        self.article_2.save()
+        Article.objects.bulk_create(
+            [Article(title="Python tips", body="python python", user=self.user_2)]
+        )
+        url = reverse("articles-list")
+        response = self.client.get(url, {"q": "Python"})
+        titles = [item["title"] for item in response.data["results"]]
+        self.assertEqual(["Python tips", "Test_article_2"], titles)
+        response = self.client.get(
+            url, {"q": "python", "ordering": "-rank", "page_size": 1}
+        )
+        self.assertEqual("Python tips", response.data["results"][0]["title"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual("Test_article_2", response.data["results"][0]["title"])
+        response = self.client.get(url, {"q": "hello_1 python"})
+        self.assertEqual([], response.data["results"])
+        self.article_1.delete()
+        response = self.client.get(url, {"q": "hello_1"})
+        self.assertEqual([], response.data["results"])
+
+    def test_substring_search(self):
+        # The fallback for databases without full-text search.
+        Article.objects.bulk_create(
+            [
+                Article(title="Python tips", body="more tips", user=self.user_2),
+                Article(title="Notes", body="python tips", user=self.user_2),
+            ]
+        )
+        queryset = substring_search(Article.objects.all(), "Python, tips")
+        ranks = dict(queryset.values_list("title", "rank"))
+        self.assertEqual({"Python tips": 2.0, "Notes": 1.0}, ranks)
+        self.assertFalse(substring_search(Article.objects.all(), "!?").exists())
+
+    def test_filter(self):
+        url = reverse("articles-list")
+        response = self.client.get(url, {"author": self.user_2.id})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_3.id], ids)
+        response = self.client.get(
+            url, {"created_after": self.article_2.created.isoformat()}
+        )
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_3.id, self.article_2.id], ids)
+        ReadArticle.objects.create(
+            user=self.user_1, article=self.article_1, is_read=True
+        )
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(url, {"is_read": "true"})
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_1.id], ids)
+
     def test_create(self):
         self.assertEqual(3, Article.objects.all().count())
         url = reverse("articles-list")
@@ -90,6 +297,51 @@ class ArticlesApiTestCase(APITestCase):
         )
         self.assertTrue(read_article.is_read)
 
+    def test_mark_read_bulk(self):
+        ReadArticle.objects.create(user=self.user_2, article=self.article_1)
+        url = reverse("readarticle-bulk")
+        data = {"articles": [self.article_1.id, self.article_2.id, 999]}
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.post(
+            url, data=json.dumps(data), content_type="application/json"
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(
+            [
+                {"article": self.article_1.id, "status": "updated"},
+                {"article": self.article_2.id, "status": "created"},
+                {"article": 999, "status": "not_found"},
+            ],
+            response.data["results"],
+        )
+        self.assertEqual(
+            2, ReadArticle.objects.filter(user=self.user_2, is_read=True).count()
+        )
+        response = self.client.get(reverse("articles-unread-count"))
+        self.assertEqual({"unread": 0}, response.data)
+
+    def test_mark_read_bulk_up_to(self):
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(reverse("articles-feed"), {"page_size": 1})
+        cursor = parse_qs(urlparse(response.data["next"]).query)["cursor"][0]
+        response = self.client.post(
+            reverse("readarticle-bulk"),
+            data=json.dumps({"up_to": cursor}),
+            content_type="application/json",
+        )
+        self.assertEqual(
+            [{"article": self.article_2.id, "status": "created"}],
+            response.data["results"],
+        )
+        response = self.client.post(
+            reverse("readarticle-bulk"),
+            data=json.dumps({"up_to": "garbage"}),
+            content_type="application/json",
+        )
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
     def test_feed(self):
         url = reverse("articles-feed")
         refresh = RefreshToken.for_user(self.user_2)
@@ -100,19 +352,471 @@ class ArticlesApiTestCase(APITestCase):
         self.assertEqual(serializer_data, response.data.get("results"))
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_feed_fan_out(self):
+        self.assertEqual(2, FeedEntry.objects.filter(subscriber=self.user_2).count())
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        data = json.dumps({"title": "Python 310", "body": "new release!"})
+        response = self.client.post(
+            reverse("articles-list"), data=data, content_type="application/json"
+        )
+        self.assertTrue(
+            FeedEntry.objects.filter(
+                subscriber=self.user_2, article_id=response.data["id"]
+            ).exists()
+        )
+        self.subscription.delete()
+        self.assertFalse(FeedEntry.objects.filter(subscriber=self.user_2).exists())
+
+    @override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=0)
+    def test_feed_hot_author(self):
+        cache.clear()
+        article = Article.objects.create(
+            title="Test_article_4", body="hello_4", user=self.user_1
+        )
+        self.assertFalse(FeedEntry.objects.filter(article=article).exists())
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(reverse("articles-feed"))
+        ids = [item["id"] for item in response.data.get("results")]
+        self.assertEqual([article.id, self.article_2.id, self.article_1.id], ids)
+
+    @override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=1)
+    def test_feed_hot_author_cools_down(self):
+        user_3 = User.objects.create_user(username="kate", password="wbblog")
+        subscription = SubscriptionUser.objects.create(
+            user=self.user_1, subscriber=user_3
+        )
+        cache.clear()
+        article = Article.objects.create(
+            title="Test_article_4", body="hello_4", user=self.user_1
+        )
+        self.assertFalse(FeedEntry.objects.filter(article=article).exists())
+        # Back at the limit, what was published while hot is delivered.
+        subscription.delete()
+        self.assertEqual(
+            [self.user_2.id],
+            list(
+                FeedEntry.objects.filter(article=article).values_list(
+                    "subscriber_id", flat=True
+                )
+            ),
+        )
+        self.assertNotIn(self.user_1.id, hot_author_ids())
+
+    @override_settings(FEED_FANOUT_MAX_SUBSCRIBERS=0)
+    def test_feed_ranked_hot_author(self):
+        cache.clear()
+        article = Article.objects.create(
+            title="Test_article_4", body="hello_4", user=self.user_1
+        )
+        Article.objects.filter(pk=article.pk).update(num_reads=3)
+        self.assertFalse(FeedEntry.objects.filter(article=article).exists())
+        scores = dict(ranked_feed_queryset(self.user_2).values_list("id", "score"))
+        self.assertEqual(
+            {self.article_1.id, self.article_2.id, article.id}, set(scores)
+        )
+        article.refresh_from_db()
+        self.assertAlmostEqual(
+            ranking.score(article.created, 0, 3), scores[article.id], places=6
+        )
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(reverse("articles-feed") + "?ordering=-score")
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual(article.id, ids[0])
+
+    def test_feed_ranked(self):
+        user_3 = User.objects.create_user(username="kate", password="wbblog")
+        article_4 = Article.objects.create(
+            title="Test_article_4", body="hello_4", user=user_3
+        )
+        SubscriptionUser.objects.create(user=user_3, subscriber=self.user_2)
+        url = reverse("articles-feed") + "?ordering=-score"
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(url)
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([article_4.id, self.article_2.id, self.article_1.id], ids)
+
+        # Reading an author lifts their articles, the read one the most.
+        self.client.patch(
+            f"/api/articles/read_articles/{self.article_1.id}/",
+            data=json.dumps({"is_read": True}),
+            content_type="application/json",
+        )
+        # The receipt leaves the article row to the periodic recount.
+        self.article_1.refresh_from_db()
+        self.assertEqual(0, self.article_1.num_reads)
+        call_command("rebuild_feed_scores", "--reads-only", stdout=StringIO())
+        self.article_1.refresh_from_db()
+        self.assertEqual(1, self.article_1.num_reads)
+        response = self.client.get(f"{url}&page_size=2")
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([self.article_1.id, self.article_2.id], ids)
+        response = self.client.get(response.data["next"])
+        ids = [item["id"] for item in response.data["results"]]
+        self.assertEqual([article_4.id], ids)
+
+        # The incrementally maintained scores match a full rebuild.
+        scores = dict(FeedEntry.objects.values_list("id", "score"))
+        call_command("rebuild_feed_scores", stdout=StringIO())
+        for entry_id, score in FeedEntry.objects.values_list("id", "score"):
+            self.assertAlmostEqual(scores[entry_id], score, places=6)
+
+    @override_settings(OUTBOX_ENABLED=True)
+    def test_feed_outbox(self):
+        metrics.reset()
+        url = reverse("articles-unread-count")
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.assertEqual({"unread": 2}, self.client.get(url).data)
+        article = Article.objects.create(
+            title="Test_article_4", body="hello_4", user=self.user_1
+        )
+        OutboxEvent.objects.create(topic="unknown", payload={})
+        self.assertFalse(FeedEntry.objects.filter(article=article).exists())
+        self.assertEqual({"unread": 2}, self.client.get(url).data)
+
+        with self.assertLogs("articles.outbox", "WARNING"):
+            self.assertEqual(2, outbox.process_batch())
+        self.assertTrue(FeedEntry.objects.filter(article=article).exists())
+        self.assertEqual({"unread": 3}, self.client.get(url).data)
+        failed = OutboxEvent.objects.get()
+        self.assertEqual(1, failed.attempts)
+        self.assertIn("KeyError", failed.last_error)
+        self.assertGreater(failed.available_at, timezone.now())
+
+        self.subscription.delete()
+        self.assertEqual(3, FeedEntry.objects.filter(subscriber=self.user_2).count())
+        self.assertEqual(1, outbox.process_batch())
+        self.assertFalse(FeedEntry.objects.filter(subscriber=self.user_2).exists())
+        self.assertEqual({"unread": 0}, self.client.get(url).data)
+        self.assertEqual(0, outbox.process_batch())
+        counters = metrics.snapshot()["counters"]
+        self.assertEqual(2, counters["outbox.published"])
+        self.assertEqual(2, counters["outbox.processed"])
+        self.assertEqual(1, counters["outbox.retried"])
+
     def test_feed_read(self):
         url = reverse("articles-feed-read")
         refresh = RefreshToken.for_user(self.user_1)
         self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
         response = self.client.get(url, content_type="application/json")
         articles = Article.objects.filter(
-            Q(user__authors__subscriber=self.user_1, readarticle__is_read=False)
-            | Q(user__authors__subscriber=self.user_1, readarticle__is_read=None)
-        )
+            user__authors__subscriber=self.user_1
+        ).exclude(readarticle__user=self.user_1, readarticle__is_read=True)
         serializer_data = ArticleSerializer(articles, many=True).data
         self.assertEqual(serializer_data, response.data.get("results"))
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_feed_read_unread_only(self):
+        ReadArticle.objects.create(
+            user=self.user_1, article=self.article_1, is_read=True
+        )
+        ReadArticle.objects.create(
+            user=self.user_2, article=self.article_2, is_read=True
+        )
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(reverse("articles-feed-read"))
+        ids = [item["id"] for item in response.data.get("results")]
+        self.assertEqual([self.article_1.id], ids)
+
+    def test_unread_count(self):
+        url = reverse("articles-unread-count")
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.assertEqual({"unread": 2}, self.client.get(url).data)
+        self.client.patch(
+            f"/api/articles/read_articles/{self.article_1.id}/",
+            data=json.dumps({"is_read": True}),
+            content_type="application/json",
+        )
+        self.assertEqual({"unread": 1}, self.client.get(url).data)
+        Article.objects.create(title="Test_article_4", body="hello_4", user=self.user_1)
+        self.assertEqual({"unread": 2}, self.client.get(url).data)
+        self.article_2.delete()
+        self.assertEqual({"unread": 1}, self.client.get(url).data)
+        self.subscription.delete()
+        self.assertEqual({"unread": 0}, self.client.get(url).data)
+
+    @override_settings(
+        READ_RECEIPTS_WRITE_BEHIND=True,
+        READ_RECEIPTS_BUFFER_SIZE=3,
+        READ_RECEIPTS_FLUSH_INTERVAL=0,
+    )
+    def test_mark_read_write_behind(self):
+        metrics.reset()
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.assertEqual(
+            {"unread": 2}, self.client.get(reverse("articles-unread-count")).data
+        )
+        for is_read in (False, True):
+            response = self.client.patch(
+                f"/api/articles/read_articles/{self.article_1.id}/",
+                data=json.dumps({"is_read": is_read}),
+                content_type="application/json",
+            )
+        self.assertEqual(status.HTTP_202_ACCEPTED, response.status_code)
+        self.assertEqual(
+            {"user": self.user_2.id, "article": self.article_1.id, "is_read": True},
+            response.data,
+        )
+        self.assertFalse(ReadArticle.objects.filter(user=self.user_2).exists())
+        self.assertEqual(1, metrics.snapshot()["gauges"]["receipts.buffer_depth"])
+
+        # The same user reads their own writes.
+        response = self.client.get(reverse("articles-feed-read"))
+        ids = [item["id"] for item in response.data.get("results")]
+        self.assertEqual([self.article_2.id], ids)
+        self.assertEqual(
+            {"unread": 1}, self.client.get(reverse("articles-unread-count")).data
+        )
+        self.assertTrue(
+            ReadArticle.objects.get(user=self.user_2, article=self.article_1).is_read
+        )
+
+        # Reaching the size threshold flushes every user's receipts in one batch.
+        writebehind.buffer.add(self.user_1.id, self.article_3.id, True)
+        writebehind.buffer.add(self.user_2.id, self.article_2.id, True)
+        writebehind.buffer.add(self.user_2.id, 999, True)
+        self.assertEqual(3, ReadArticle.objects.filter(is_read=True).count())
+        self.assertEqual(
+            {"unread": 0}, self.client.get(reverse("articles-unread-count")).data
+        )
+        snapshot = metrics.snapshot()
+        self.assertEqual(0, snapshot["gauges"]["receipts.buffer_depth"])
+        self.assertEqual(4, snapshot["counters"]["receipts.flushed"])
+        self.assertEqual(2, snapshot["timings"]["receipts.flush_ms"]["count"])
+
+        response = self.client.patch(
+            "/api/articles/read_articles/abc/",
+            data=json.dumps({"is_read": True}),
+            content_type="application/json",
+        )
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+    @override_settings(
+        READ_RECEIPTS_WRITE_BEHIND=True,
+        READ_RECEIPTS_BUFFER_SIZE=100,
+        READ_RECEIPTS_FLUSH_INTERVAL=0,
+    )
+    def test_write_behind_failed_flush_requeues(self):
+        writebehind.buffer.add(self.user_2.id, self.article_1.id, True)
+        with patch("articles.receipts.save_states", side_effect=OperationalError):
+            writebehind.buffer.flush()
+        self.assertFalse(ReadArticle.objects.filter(user=self.user_2).exists())
+        # A newer write of the same receipt wins over the failed batch.
+        writebehind.buffer.add(self.user_2.id, self.article_2.id, False)
+        writebehind.buffer.flush()
+        self.assertEqual(
+            {self.article_1.id: True, self.article_2.id: False},
+            dict(
+                ReadArticle.objects.filter(user=self.user_2).values_list(
+                    "article_id", "is_read"
+                )
+            ),
+        )
+
+    @override_settings(
+        READ_RECEIPTS_WRITE_BEHIND=True,
+        READ_RECEIPTS_BUFFER_SIZE=100,
+        READ_RECEIPTS_FLUSH_INTERVAL=0,
+    )
+    def test_write_behind_flush_user_waits_for_batch(self):
+        buffer = writebehind.ReceiptBuffer()
+        writing, release, written = threading.Event(), threading.Event(), []
+
+        def save_states(states):
+            writing.set()
+            release.wait(5)
+            written.append(states)
+
+        buffer.add(self.user_2.id, self.article_1.id, True)
+        with patch("articles.receipts.save_states", side_effect=save_states):
+            flusher = threading.Thread(target=buffer.flush)
+            flusher.start()
+            self.assertTrue(writing.wait(5))
+            reader = threading.Thread(
+                target=buffer.flush_user, args=(self.user_2,)
+            )
+            reader.start()
+            reader.join(0.05)
+            # The receipt was taken but is not written yet.
+            self.assertTrue(reader.is_alive())
+            release.set()
+            flusher.join(5)
+            reader.join(5)
+        self.assertFalse(reader.is_alive())
+        self.assertEqual([{(self.user_2.id, self.article_1.id): True}], written)
+
+    @override_settings(
+        READ_RECEIPTS_WRITE_BEHIND=True,
+        READ_RECEIPTS_BUFFER_SIZE=2,
+        READ_RECEIPTS_BUFFER_LIMIT=2,
+        READ_RECEIPTS_FLUSH_INTERVAL=0,
+    )
+    def test_write_behind_full_buffer_writes_through(self):
+        metrics.reset()
+        buffer = writebehind.ReceiptBuffer()
+        with patch(
+            "articles.receipts.save_states", side_effect=OperationalError
+        ) as save_states:
+            buffer.add(self.user_2.id, self.article_1.id, True)
+            buffer.add(self.user_2.id, self.article_2.id, True)
+            self.assertEqual(1, save_states.call_count)
+            # Updates of buffered receipts do not retry the failed batch.
+            buffer.add(self.user_2.id, self.article_2.id, False)
+            self.assertEqual(1, save_states.call_count)
+        buffer.add(self.user_1.id, self.article_3.id, True)
+        self.assertEqual(
+            [(self.user_1.id, self.article_3.id)],
+            list(ReadArticle.objects.values_list("user_id", "article_id")),
+        )
+        self.assertEqual(1, metrics.snapshot()["counters"]["receipts.buffer_full"])
+        buffer.flush()
+        self.assertFalse(
+            ReadArticle.objects.get(user=self.user_2, article=self.article_2).is_read
+        )
+
+    @override_settings(
+        READ_RECEIPTS_WRITE_BEHIND=True,
+        READ_RECEIPTS_BUFFER_SIZE=100,
+        READ_RECEIPTS_FLUSH_INTERVAL=0,
+    )
+    async def test_async_list_is_read_flushes(self):
+        await sync_to_async(writebehind.buffer.add)(
+            self.user_2.id, self.article_1.id, True
+        )
+        refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(
+            self.user_2
+        )
+        response = await self.async_client.get(
+            reverse("async-articles-list"),
+            {"is_read": "true"},
+            AUTHORIZATION=f"Bearer {refresh.access_token}",
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        ids = [item["id"] for item in response.json()["results"]]
+        self.assertEqual([self.article_1.id], ids)
+
+    def query_plans(self, url):
+        """Planner output for the SELECTs run while serving ``url``."""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        explain = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+        plans = []
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                # Test tables are tiny; plan as if scanning them were costly.
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            for query in captured:
+                if query["sql"].startswith("SELECT"):
+                    cursor.execute(f"{explain} {query['sql']}")
+                    plans.extend(str(row[-1]) for row in cursor.fetchall())
+        return "\n".join(plans)
+
+    @override_settings(ARTICLES_CACHE_TIMEOUT=0)
+    def test_query_plans_use_indexes(self):
+        self.assertIn("article_created", self.query_plans(reverse("articles-list")))
+        self.assertIn(
+            "article_user_created",
+            self.query_plans(f"{reverse('articles-list')}?author={self.user_1.id}"),
+        )
+        self.assertIn(
+            "profile_num_articles",
+            self.query_plans(f"{reverse('user-list')}?ordering=-num_articles"),
+        )
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        # The feed is one range scan of the subscriber's entries, unsorted.
+        plans = self.query_plans(reverse("articles-feed"))
+        self.assertIn("feedentry_subscriber_created", plans)
+        sort = "TEMP B-TREE" if connection.vendor == "sqlite" else "Sort"
+        self.assertNotIn(sort, plans)
+        plans = self.query_plans(reverse("articles-feed-read"))
+        self.assertIn("feedentry_subscriber_created", plans)
+        # Receipts are looked up through an index, never scanned.
+        self.assertRegex(
+            plans,
+            r"SEARCH U0 USING (COVERING )?INDEX"
+            r"|Index (Only )?Scan using \w+ on articles_readarticle",
+        )
+        self.assertNotRegex(plans, r"SCAN U0\b|Seq Scan on articles_readarticle")
+        self.assertIn(
+            "feedentry_subscriber_score",
+            self.query_plans(f"{reverse('articles-feed')}?ordering=-score"),
+        )
+
+    async def test_async_list(self):
+        response = await self.async_client.get(
+            reverse("async-articles-list"), {"page_size": 2}
+        )
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        ids = [item["id"] for item in response.json()["results"]]
+        self.assertEqual([self.article_3.id, self.article_2.id], ids)
+        self.assertIsNotNone(response.json()["next"])
+
+    async def test_async_feed(self):
+        url = reverse("async-articles-feed")
+        response = await self.async_client.get(url)
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(
+            self.user_2
+        )
+        response = await self.async_client.get(
+            url, AUTHORIZATION=f"Bearer {refresh.access_token}"
+        )
+        ids = [item["id"] for item in response.json()["results"]]
+        self.assertEqual([self.article_2.id, self.article_1.id], ids)
+        response = await self.async_client.get(
+            reverse("async-articles-feed-read"),
+            AUTHORIZATION=f"Bearer {refresh.access_token}",
+        )
+        self.assertEqual(2, len(response.json()["results"]))
+
+    async def test_async_matches_sync_list(self):
+        refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(
+            self.user_2
+        )
+        auth = f"Bearer {refresh.access_token}"
+        for name, params in (
+            ("articles-list", {"fields": "id,title"}),
+            ("articles-list", {"omit": "body", "ordering": "created"}),
+            ("articles-feed", {"ordering": "-score"}),
+            ("articles-feed", {"fields": "nope"}),
+        ):
+            with self.subTest(name=name, params=params):
+                expected = await sync_to_async(self.client.get)(
+                    reverse(name), params, HTTP_AUTHORIZATION=auth
+                )
+                response = await self.async_client.get(
+                    reverse(f"async-{name}"), params, AUTHORIZATION=auth
+                )
+                self.assertEqual(expected.status_code, response.status_code)
+                self.assertEqual(expected.json(), response.json())
+
+    async def test_async_profile(self):
+        refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(
+            self.user_1
+        )
+        response = await self.async_client.get(
+            reverse("async-user-detail", args=("current",)),
+            AUTHORIZATION=f"Bearer {refresh.access_token}",
+        )
+        data = response.json()
+        self.assertEqual(self.user_1.id, data["id"])
+        self.assertEqual(2, data["num_articles"])
+        authors = [{"id": self.subscription.id, "subscriber": self.user_2.id}]
+        self.assertEqual(authors, data["authors"])
+        response = await self.async_client.get(
+            reverse("async-user-detail", args=(999,))
+        )
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
     def test_list_users(self):
         url = reverse("user-list")
         response = self.client.get(url)
@@ -126,6 +830,419 @@ class ArticlesApiTestCase(APITestCase):
         self.assertEqual(2, User.objects.all().count())
         self.assertEqual(status.HTTP_200_OK, response.status_code)
 
+    def test_list_users_queries(self):
+        for index in range(5):
+            user = User.objects.create_user(username=f"user_{index}", password="wbblog")
+            SubscriptionUser.objects.create(user=self.user_1, subscriber=user)
+        url = reverse("user-list")
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertEqual(7, len(response.data.get("results")))
+        self.assertNotIsInstance(response.accepted_renderer, ORJSONRenderer)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+        self.assertIsInstance(response.accepted_renderer, ORJSONRenderer)
+
+    def test_values_list_identical_output(self):
+        Article.objects.create(
+            title="Test_article_\u2028", body="h\u00e9llo \U0001f600", user=self.user_2
+        )
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        urls = [
+            reverse("articles-list") + "?page_size=2",
+            reverse("articles-list") + "?ordering=updated&page=1",
+            reverse("articles-feed"),
+            reverse("articles-list") + "?fields=id,title,summary&page_size=2",
+            reverse("articles-feed") + "?omit=body",
+            reverse("user-list"),
+            reverse("user-list") + "?compact=1",
+            reverse("user-list") + "?fields=username,subscribers",
+            reverse("user-list") + "?compact=1&omit=email,followers_count",
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                with override_settings(FAST_LIST_SERIALIZATION=True):
+                    fast = self.client.get(url)
+                slow = self.client.get(url)
+                self.assertEqual(status.HTTP_200_OK, fast.status_code)
+                self.assertEqual(slow.content, fast.content)
+
+    @override_settings(ARTICLES_CACHE_TIMEOUT=0)
+    def test_sparse_fieldsets(self):
+        url = reverse("articles-list")
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {"fields": "title,id,summary"})
+        self.assertEqual(
+            [["id", "title", "summary"]] * 3,
+            [list(item) for item in response.data["results"]],
+        )
+        self.assertNotIn('"body"', captured[-1]["sql"])
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(url, {"omit": "body"})
+        self.assertEqual(
+            ["id", "user", "title", "summary", "created", "updated"],
+            list(response.data["results"][0]),
+        )
+        self.assertEqual("hello_3", response.data["results"][0]["summary"])
+        self.assertNotIn('"body"', captured[-1]["sql"])
+        response = self.client.get(url, {"omit": "body,summary"})
+        self.assertEqual(
+            ["id", "user", "title", "created", "updated"],
+            list(response.data["results"][0]),
+        )
+        response = self.client.get(
+            reverse("articles-detail", args=(self.article_1.id,)), {"fields": "title"}
+        )
+        self.assertEqual({"title": "Test_article_1"}, response.data)
+        for params in ({"fields": "title,rank"}, {"omit": "password"}):
+            response = self.client.get(url, params)
+            self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                reverse("user-list"), {"fields": "id,username"}
+            )
+        self.assertEqual(
+            {"id": self.user_1.id, "username": "alex"}, response.data["results"][0]
+        )
+
+    def test_article_summary(self):
+        body = " ".join(["word"] * 100)
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.post(
+            reverse("articles-list"), {"title": "Long", "body": body}, format="json"
+        )
+        summary = response.data["summary"]
+        self.assertLessEqual(len(summary), 200)
+        self.assertTrue(summary.endswith(" word\u2026"))
+        response = self.client.patch(
+            reverse("articles-detail", args=(response.data["id"],)),
+            {"body": "  short\n body "},
+            format="json",
+        )
+        self.assertEqual("short body", response.data["summary"])
+        self.assertEqual(
+            "short body", Article.objects.get(pk=response.data["id"]).summary
+        )
+
+    def test_list_users_compact(self):
+        url = reverse("user-list")
+        response = self.client.get(url, {"compact": "1"})
+        user_1, user_2 = response.data.get("results")
+        self.assertEqual((1, 0), (user_1["followers_count"], user_1["following_count"]))
+        self.assertEqual((0, 1), (user_2["followers_count"], user_2["following_count"]))
+        self.assertNotIn("authors", user_1)
+
+    def test_current_user(self):
+        url = reverse("user-detail", args=("current",))
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(self.user_2.id, response.data["id"])
+        self.assertEqual(1, response.data["num_articles"])
+
+    def test_profile_counters(self):
+        profile = Profile.objects.get(user=self.user_1)
+        counts = (profile.num_articles, profile.num_followers, profile.num_following)
+        self.assertEqual((2, 1, 0), counts)
+        self.article_1.delete()
+        self.subscription.delete()
+        profile.refresh_from_db()
+        counts = (profile.num_articles, profile.num_followers, profile.num_following)
+        self.assertEqual((1, 0, 0), counts)
+        self.assertEqual(0, Profile.objects.get(user=self.user_2).num_following)
+
+    def test_rebuild_counters(self):
+        Profile.objects.filter(user=self.user_1).update(num_articles=7)
+        Profile.objects.filter(user=self.user_2).delete()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_counters", "--verify", stdout=StringIO())
+        call_command("rebuild_counters", "--chunk-size", "1", stdout=StringIO())
+        self.assertEqual(2, Profile.objects.get(user=self.user_1).num_articles)
+        self.assertEqual(1, Profile.objects.get(user=self.user_2).num_following)
+        call_command("rebuild_counters", "--verify", stdout=StringIO())
+
+    def test_query_budgets(self):
+        for index in range(5):
+            user = User.objects.create_user(username=f"user_{index}", password="wbblog")
+            SubscriptionUser.objects.create(user=user, subscriber=self.user_2)
+            SubscriptionUser.objects.create(user=self.user_2, subscriber=user)
+            Article.objects.create(title=f"Article {index}", body="body", user=user)
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.client.get(reverse("articles-unread-count"))
+        budgets = {
+            reverse("articles-list"): 1,
+            reverse("articles-list") + "?ordering=updated&page=1": 2,
+            reverse("articles-detail", args=(self.article_1.id,)): 1,
+            reverse("articles-feed"): 1,
+            reverse("articles-feed-read"): 1,
+            reverse("articles-unread-count"): 1,
+            reverse("user-list"): 4,
+            reverse("user-list") + "?compact=1": 2,
+            reverse("user-detail", args=("current",)): 3,
+            reverse("subscriptionuser-list"): 2,
+        }
+        with override_settings(ARTICLES_CACHE_TIMEOUT=0):
+            self.assertQueryBudgets(budgets, self.client.get)
+
+    def test_server_timing(self):
+        with override_settings(REQUEST_TIMING_HEADER=True):
+            response = self.client.get(reverse("articles-list"))
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+        self.assertIn("render;dur=", response["Server-Timing"])
+
+    async def test_server_timing_async(self):
+        with override_settings(REQUEST_TIMING_HEADER=True):
+            response = await self.async_client.get(reverse("async-articles-list"))
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    def staff_credentials(self, user):
+        refresh = UserTokenObtainPairSerializer.get_token(user)
+        refresh["is_staff"] = True
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_export(self):
+        url = reverse("articles-export")
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.get(url).status_code)
+        self.staff_credentials(self.user_1)
+        response = self.client.get(url, {"author": self.user_1.id})
+        self.assertEqual("application/x-ndjson", response["Content-Type"])
+        lines = b"".join(response.streaming_content).splitlines()
+        articles = Article.objects.filter(user=self.user_1).order_by("id")
+        self.assertEqual(
+            ArticleSerializer(articles, many=True).data,
+            [json.loads(line) for line in lines],
+        )
+
+    def test_import(self):
+        self.staff_credentials(self.user_1)
+        lines = b"".join(self.client.get(reverse("articles-export")).streaming_content)
+        lines += b'{"user": 999, "title": "t", "body": "b"}\nnot json\n'
+        response = self.client.post(
+            reverse("articles-import-articles"),
+            data=lines,
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(3, response.data["created"])
+        self.assertEqual([4, 5], [error["line"] for error in response.data["errors"]])
+        copy = Article.objects.filter(title="Test_article_1").latest("id")
+        self.assertEqual(self.article_1.created, copy.created)
+        self.assertTrue(FeedEntry.objects.filter(article=copy, subscriber=self.user_2))
+        self.assertEqual(4, Profile.objects.get(user=self.user_1).num_articles)
+
+    @override_settings(OUTBOX_ENABLED=True)
+    def test_import_outbox(self):
+        self.staff_credentials(self.user_1)
+        line = json.dumps({"user": self.user_1.id, "title": "t", "body": "b"})
+        response = self.client.post(
+            reverse("articles-import-articles"),
+            data=f"{line}\n{line}\n",
+            content_type="application/x-ndjson",
+        )
+        self.assertEqual(2, response.data["created"])
+        imported = Article.objects.filter(title="t")
+        self.assertFalse(FeedEntry.objects.filter(article__in=imported).exists())
+        self.assertEqual(1, OutboxEvent.objects.count())
+        self.assertEqual(1, outbox.process_batch())
+        entries = FeedEntry.objects.filter(article__in=imported, subscriber=self.user_2)
+        self.assertEqual(2, entries.count())
+
+    def test_seed(self):
+        call_command("seed", "--users", "20", "--articles", "200", stdout=StringIO())
+        self.assertEqual(22, User.objects.count())
+        self.assertEqual(203, Article.objects.count())
+        # Spread over the past year, not stamped with the time of the run.
+        seeded = Article.objects.filter(user__username__startswith="seed_")
+        self.assertGreater(seeded.values("created").distinct().count(), 100)
+        self.assertFalse(seeded.exclude(updated=F("created")).exists())
+        self.assertTrue(FeedEntry.objects.exists())
+        self.assertTrue(ReadArticle.objects.exists())
+        call_command("rebuild_counters", "--verify", stdout=StringIO())
+
+    def test_schema_cached(self):
+        schema_cache.clear()
+        url = reverse("schema-json", kwargs={"format": ".json"})
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertIn("/articles/", json.loads(response.content)["paths"])
+        etag = response["ETag"]
+        self.assertEqual(1, len(schema_cache.documents))
+        again = self.client.get(url)
+        self.assertEqual((response.content, etag), (again.content, again["ETag"]))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(status.HTTP_304_NOT_MODIFIED, response.status_code)
+        response = self.client.get(
+            reverse("schema-swagger-ui"), {"format": "openapi"}
+        )
+        self.assertNotEqual(etag, response["ETag"])
+        self.assertEqual(
+            status.HTTP_200_OK, self.client.get(reverse("schema-redoc")).status_code
+        )
+
+        with TemporaryDirectory() as directory, override_settings(
+            API_SCHEMA_CACHE_DIR=directory
+        ):
+            schema_cache.clear()
+            call_command(
+                "generate_schema",
+                "--url=http://testserver",
+                "--format=.json",
+                "--format=openapi",
+                stdout=StringIO(),
+            )
+            self.assertEqual(2, len(os.listdir(directory)))
+            schema_cache.clear()
+            response = self.client.get(url)
+            self.assertEqual((again.content, etag), (response.content, response["ETag"]))
+
+    def test_schema_cache_bounded(self):
+        schema_cache.clear()
+        url = reverse("schema-json", kwargs={"format": ".json"})
+        with override_settings(ALLOWED_HOSTS=["testserver", ".example.com"]):
+            response = self.client.get(url, HTTP_HOST="made-up.example.com")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(0, len(schema_cache.documents))
+            response = self.client.get(url, HTTP_HOST="TESTSERVER.")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            self.assertEqual(1, len(schema_cache.documents))
+
+        with TemporaryDirectory() as directory, override_settings(
+            API_SCHEMA_CACHE_DIR=directory, API_SCHEMA_CACHE_SIZE=2
+        ):
+            for key in ("a", "b", "c"):
+                schema_cache.set(key, key.encode())
+            self.assertEqual(["b", "c"], list(schema_cache.documents))
+            self.assertEqual(2, len(os.listdir(directory)))
+            self.assertIsNone(schema_cache.get("a"))
+        schema_cache.clear()
+
+    def test_claims_authentication(self):
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        url = reverse("articles-unread-count")
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        tables = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertNotIn("auth_user", tables)
+
+    def test_claims_revoked_on_deactivation(self):
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        url = reverse("articles-feed")
+        self.assertEqual(status.HTTP_200_OK, self.client.get(url).status_code)
+        self.user_2.is_active = False
+        self.user_2.save()
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, self.client.get(url).status_code)
+
+    def test_claims_missing_read_from_user(self):
+        self.user_1.is_staff = True
+        self.user_1.save()
+        # Issued before the claims existed.
+        refresh = RefreshToken.for_user(self.user_1)
+        refresh[VERSION_CLAIM] = token_version(self.user_1.id)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_refresh_rejected_after_revocation(self):
+        url = reverse("token-refresh")
+        refresh = str(UserTokenObtainPairSerializer.get_token(self.user_2))
+        Profile.objects.filter(user=self.user_2).delete()
+        revoke_tokens(self.user_2.id)
+        self.assertEqual(1, Profile.objects.get(user=self.user_2).token_version)
+        response = self.client.post(url, {"refresh": refresh}, format="json")
+        self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+        refresh = str(UserTokenObtainPairSerializer.get_token(self.user_2))
+        response = self.client.post(url, {"refresh": refresh}, format="json")
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+
+    def test_login_token_claims(self):
+        response = self.client.post(
+            "/api/users/login/",
+            data=json.dumps({"username": "alex", "password": "wbblog"}),
+            content_type="application/json",
+        )
+        token = AccessToken(response.data["access"])
+        claims = (token["is_staff"], token["is_active"], token["ver"])
+        self.assertEqual((False, True, 0), claims)
+
+    def test_refresh_rotation_blacklists(self):
+        with TemporaryDirectory() as location, override_settings(
+            CACHES={
+                "default": {
+                    "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                    "LOCATION": location,
+                }
+            }
+        ):
+            blacklist_index.clear()
+            url = reverse("token-refresh")
+            refresh = str(UserTokenObtainPairSerializer.get_token(self.user_1))
+            response = self.client.post(url, {"refresh": refresh}, format="json")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            rotated = response.data["refresh"]
+            response = self.client.post(url, {"refresh": refresh}, format="json")
+            self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+            counters = metrics.snapshot()["counters"]
+            skipped = counters.get("auth.blacklist.db_skipped", 0)
+            response = self.client.post(url, {"refresh": rotated}, format="json")
+            self.assertEqual(status.HTTP_200_OK, response.status_code)
+            counters = metrics.snapshot()["counters"]
+            self.assertEqual(skipped + 1, counters["auth.blacklist.db_skipped"])
+
+    def test_refresh_replay_against_stale_filter(self):
+        # Another worker built its filter before the token was rotated and
+        # its recent key is gone, as with a per-process cache.
+        url = reverse("token-refresh")
+        for backend in (
+            "django.core.cache.backends.locmem.LocMemCache",
+            "django.core.cache.backends.filebased.FileBasedCache",
+        ):
+            with self.subTest(backend), TemporaryDirectory() as location:
+                caches = {"default": {"BACKEND": backend, "LOCATION": location}}
+                with override_settings(CACHES=caches):
+                    blacklist_index.clear()
+                    refresh = UserTokenObtainPairSerializer.get_token(self.user_1)
+                    blacklist_index.might_contain(refresh["jti"])
+                    writes = blacklist_index.writes
+                    data = {"refresh": str(refresh)}
+                    response = self.client.post(url, data, format="json")
+                    self.assertEqual(status.HTTP_200_OK, response.status_code)
+                    blacklist_index.bloom = BloomFilter(1024)
+                    blacklist_index.writes = writes
+                    cache.delete(recent_key(refresh["jti"]))
+                    response = self.client.post(url, data, format="json")
+                    self.assertEqual(status.HTTP_401_UNAUTHORIZED, response.status_code)
+
+    def test_prune_tokens(self):
+        expired = UserTokenObtainPairSerializer.get_token(self.user_1)
+        expired.blacklist()
+        OutstandingToken.objects.update(expires_at=timezone.now())
+        live = UserTokenObtainPairSerializer.get_token(self.user_1)
+        call_command("prune_tokens", "--batch-size", "1", stdout=StringIO())
+        self.assertEqual(
+            [live["jti"]], list(OutstandingToken.objects.values_list("jti", flat=True))
+        )
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+    def test_metrics_staff_only(self):
+        url = reverse("metrics")
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_1)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        self.assertEqual(status.HTTP_403_FORBIDDEN, self.client.get(url).status_code)
+        refresh["is_staff"] = True
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.get(url)
+        self.assertEqual(status.HTTP_200_OK, response.status_code)
+        self.assertEqual(1, response.data["gauges"]["auth.outstanding_tokens"])
+
     def test_subscribe(self):
         url = reverse("subscriptionuser-list")
         data = {"user": 2}
@@ -139,6 +1256,50 @@ class ArticlesApiTestCase(APITestCase):
         self.assertEqual(status.HTTP_201_CREATED, response.status_code)
         self.assertEqual(2, SubscriptionUser.objects.all().count())
 
+    def test_subscribe_duplicate(self):
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        response = self.client.post(
+            reverse("subscriptionuser-list"), {"user": self.user_1.id}, format="json"
+        )
+        self.assertEqual(status.HTTP_400_BAD_REQUEST, response.status_code)
+        self.assertEqual(1, SubscriptionUser.objects.count())
+
+    def test_subscribe_bulk(self):
+        users = [
+            User.objects.create_user(username=f"user_{index}", password="wbblog")
+            for index in range(3)
+        ]
+        Article.objects.create(title="Test_article_4", body="hello_4", user=users[0])
+        refresh = UserTokenObtainPairSerializer.get_token(self.user_2)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+        url = reverse("subscriptionuser-bulk")
+        ids = [self.user_1.id, users[0].id, users[1].id, 999]
+        with self.assertQueryBudget(13):
+            response = self.client.post(url, {"users": ids}, format="json")
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(["exists", "created", "created", "invalid"], statuses)
+        self.assertTrue(
+            FeedEntry.objects.filter(subscriber=self.user_2, author=users[0]).exists()
+        )
+        self.assertEqual(3, Profile.objects.get(user=self.user_2).num_following)
+        self.assertEqual(1, Profile.objects.get(user=users[0]).num_followers)
+        self.assertEqual(
+            {"unread": 3}, self.client.get(reverse("articles-unread-count")).data
+        )
+
+        data = {"users": [users[0].id, users[2].id], "subscribe": False}
+        response = self.client.post(url, data, format="json")
+        statuses = [result["status"] for result in response.data["results"]]
+        self.assertEqual(["deleted", "not_found"], statuses)
+        self.assertFalse(FeedEntry.objects.filter(author=users[0]).exists())
+        self.assertEqual(2, Profile.objects.get(user=self.user_2).num_following)
+        self.assertEqual(0, Profile.objects.get(user=users[0]).num_followers)
+        self.assertEqual(1, Profile.objects.get(user=users[1]).num_followers)
+        self.assertEqual(
+            {"unread": 2}, self.client.get(reverse("articles-unread-count")).data
+        )
+
     def test_unsubscribe(self):
         url = reverse("subscriptionuser-detail", args=(self.subscription.id,))
         self.assertEqual(1, SubscriptionUser.objects.all().count())
@@ -147,3 +1308,116 @@ class ArticlesApiTestCase(APITestCase):
         response = self.client.delete(url, content_type="application/json")
         self.assertEqual(status.HTTP_204_NO_CONTENT, response.status_code)
         self.assertEqual(0, SubscriptionUser.objects.all().count())
+
+
+@skipUnless("replica" in settings.DATABASES, "needs a second database")
+@override_settings(DATABASE_REPLICAS=["replica"], ARTICLES_CACHE_TIMEOUT=0)
+class ReplicaRoutingTestCase(QueryBudgetMixin, APITestCase):
+    # Nothing replicates between the two test databases, so reads served
+    # by the replica do not see the rows written here.
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="alex", password="wbblog")
+        self.article = Article.objects.create(
+            title="Test_article_1", body="hello_1", user=self.user
+        )
+
+    def authenticate(self):
+        refresh = UserTokenObtainPairSerializer.get_token(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {refresh.access_token}")
+
+    def test_safe_requests_read_from_replica(self):
+        for url in (
+            reverse("articles-list"),
+            reverse("user-list"),
+            reverse("subscriptionuser-list"),
+        ):
+            with self.subTest(url=url):
+                self.assertEqual([], self.client.get(url).data["results"])
+        response = self.client.get(reverse("articles-detail", args=(self.article.id,)))
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_writer_sticks_to_primary(self):
+        url = reverse("articles-list")
+        self.authenticate()
+        self.assertEqual([], self.client.get(url).data["results"])
+        response = self.client.post(url, {"title": "New", "body": "new"}, format="json")
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        self.assertEqual(2, len(self.client.get(url).data["results"]))
+
+        self.client.credentials()
+        self.assertEqual([], self.client.get(url).data["results"])
+        # Once the pin expires the writer reads from the replica again.
+        cache.clear()
+        self.authenticate()
+        self.assertEqual([], self.client.get(url).data["results"])
+
+    async def test_async_writer_sticks_to_primary(self):
+        url = reverse("articles-list")
+        refresh = await sync_to_async(UserTokenObtainPairSerializer.get_token)(
+            self.user
+        )
+        response = await self.async_client.post(
+            url,
+            {"title": "New", "body": "new"},
+            content_type="application/json",
+            AUTHORIZATION=f"Bearer {refresh.access_token}",
+        )
+        self.assertEqual(status.HTTP_201_CREATED, response.status_code)
+        response = await self.async_client.get(
+            url, AUTHORIZATION=f"Bearer {refresh.access_token}"
+        )
+        self.assertEqual(2, len(response.json()["results"]))
+
+    async def test_async_views_read_from_replica(self):
+        response = await self.async_client.get(reverse("async-articles-list"))
+        self.assertEqual([], response.json()["results"])
+        response = await self.async_client.get(
+            reverse("async-user-detail", args=(self.user.id,))
+        )
+        self.assertEqual(status.HTTP_404_NOT_FOUND, response.status_code)
+
+    def test_budget_counts_replica_queries(self):
+        with self.assertRaises(AssertionError) as raised:
+            with self.assertQueryBudget(0):
+                self.client.get(reverse("articles-list"))
+        self.assertIn("[replica]", str(raised.exception))
+
+
+class ConnectionPoolTestCase(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.pool = ConnectionPool(size=2, timeout=0.01)
+        self.addCleanup(self.pool.close)
+
+    def connect(self):
+        return sqlite3.connect(":memory:", check_same_thread=False)
+
+    def test_pool_is_bounded(self):
+        first = self.pool.acquire(self.connect)
+        second = self.pool.acquire(self.connect)
+        self.assertIsNot(first, second)
+        with self.assertRaises(OperationalError):
+            self.pool.acquire(self.connect)
+        self.pool.release(second)
+        self.assertIs(second, self.pool.acquire(self.connect))
+        snapshot = metrics.snapshot()
+        self.assertEqual(
+            {"db.pool.opened": 2, "db.pool.reused": 1, "db.pool.timeouts": 1},
+            snapshot["counters"],
+        )
+        self.assertEqual(3, snapshot["timings"]["db.pool.wait_ms"]["count"])
+
+    def test_pool_discards_unusable(self):
+        broken = self.pool.acquire(self.connect)
+        self.pool.release(broken, reusable=False)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            broken.execute("SELECT 1")
+
+        stale = self.pool.acquire(self.connect)
+        self.pool.release(stale)
+        fresh = self.pool.acquire(self.connect, check=lambda connection: False)
+        self.assertIsNot(stale, fresh)
+        self.assertEqual(2, metrics.snapshot()["counters"]["db.pool.discarded"])
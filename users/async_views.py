@@ -0,0 +1,37 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from rest_framework import exceptions, status
+
+from articles.async_views import (authenticated, build_view, error_response,
+                                  render, safe_method_only)
+from users.views import UsersViewSet
+
+
+def prepare_detail(view):
+    """Run the checks of ``view.retrieve`` and return its queryset."""
+    view.initial(view.request)
+    return view.filter_queryset(view.get_queryset())
+
+
+def serialize_user(view, user):
+    view.check_object_permissions(view.request, user)
+    return view.get_serializer(user).data
+
+
+@safe_method_only
+@authenticated(required=False)
+async def profile_detail(request, pk):
+    if pk == "current":
+        pk = request.user.pk if request.user is not None else None
+    view = build_view(UsersViewSet, request, "retrieve", pk=pk)
+    try:
+        queryset = await sync_to_async(prepare_detail)(view)
+        user = await queryset.aget(pk=pk)
+        data = await sync_to_async(serialize_user, thread_sensitive=False)(
+            view, user
+        )
+    except (User.DoesNotExist, ValueError):
+        return render({"detail": "Not found."}, status.HTTP_404_NOT_FOUND)
+    except exceptions.APIException as exc:
+        return error_response(view, exc)
+    return render(data)
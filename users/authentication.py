@@ -0,0 +1,137 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import Profile
+
+VERSION_CLAIM = "ver"
+
+_full_users = {}
+_full_users_lock = threading.Lock()
+
+
+def version_key(user_id):
+    return f"users:token_version:{user_id}"
+
+
+def token_version(user_id):
+    """Current token version of a user, cached for a short time."""
+    version = cache.get(version_key(user_id))
+    if version is None:
+        version = (
+            Profile.objects.filter(user_id=user_id)
+            .values_list("token_version", flat=True)
+            .first()
+        ) or 0
+        cache.set(
+            version_key(user_id),
+            version,
+            getattr(settings, "AUTH_TOKEN_VERSION_TIMEOUT", 60),
+        )
+    return version
+
+
+def revoke_tokens(user_id):
+    """Invalidate every token issued to a user so far."""
+    bump = {"token_version": F("token_version") + 1}
+    if not Profile.objects.filter(user_id=user_id).update(**bump):
+        _, created = Profile.objects.get_or_create(
+            user_id=user_id, defaults={"token_version": 1}
+        )
+        if not created:
+            Profile.objects.filter(user_id=user_id).update(**bump)
+    cache.delete(version_key(user_id))
+    with _full_users_lock:
+        _full_users.pop(user_id, None)
+
+
+def get_full_user(user):
+    """Return the ``User`` row behind a claims user.
+
+    Rows are kept in a small in-process cache for
+    ``AUTH_FULL_USER_TIMEOUT`` seconds.
+    """
+    if isinstance(user, User):
+        return user
+    now = time.monotonic()
+    with _full_users_lock:
+        entry = _full_users.get(user.id)
+    if entry is not None and entry[0] > now:
+        return copy.copy(entry[1])
+    full_user = User.objects.get(pk=user.id)
+    with _full_users_lock:
+        if len(_full_users) >= getattr(settings, "AUTH_FULL_USER_CACHE_SIZE", 1024):
+            _full_users.clear()
+        _full_users[user.id] = (
+            now + getattr(settings, "AUTH_FULL_USER_TIMEOUT", 30),
+            full_user,
+        )
+    return copy.copy(full_user)
+
+
+class ClaimsUser(TokenUser):
+    """User built from signed access token claims.
+
+    Tokens issued before a claim was added, or refreshed from such a
+    refresh token, lack it; its value is then read from the user row.
+    """
+
+    def claim(self, name):
+        if name in self.token:
+            return self.token[name]
+        return getattr(get_full_user(self), name)
+
+    @cached_property
+    def is_active(self):
+        return self.claim("is_active")
+
+    @cached_property
+    def is_staff(self):
+        return self.claim("is_staff")
+
+    @cached_property
+    def is_superuser(self):
+        return self.claim("is_superuser")
+
+    def __eq__(self, other):
+        return isinstance(other, (TokenUser, User)) and self.id == other.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that trusts the token claims instead of the DB.
+
+    Deactivation, password and staff changes bump the user's token
+    version, which rejects tokens carrying an older ``ver`` claim.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if validated_token.get(VERSION_CLAIM, 0) != token_version(user_id):
+            raise AuthenticationFailed(
+                _("Token has been revoked"), code="token_revoked"
+            )
+        user = ClaimsUser(validated_token)
+        try:
+            is_active = user.is_active
+        except User.DoesNotExist:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,157 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from blog import metrics
+from blog.caching import incr_counter, is_shared, read_counter
+
+# Counts blacklist writes of all processes, see BlacklistIndex.
+WRITES_KEY = "users:blacklist:writes"
+
+
+def recent_key(jti):
+    return f"users:blacklisted:{jti}"
+
+
+class BloomFilter:
+    """Set membership with false positives but no false negatives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(item)
+        )
+
+
+class BlacklistIndex:
+    """In-process Bloom filter over the JTIs of blacklisted refresh tokens.
+
+    The filter is rebuilt from the blacklist every
+    ``AUTH_BLACKLIST_REBUILD_INTERVAL`` seconds. A counter in the shared
+    cache is bumped by every blacklist write; while it differs from the
+    writes this filter has seen, possibly another worker blacklisted a
+    token the filter lacks, so misses are checked in the database. They
+    always are when the cache is not shared between processes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.built_at = 0
+        self.writes = None
+
+    def interval(self):
+        return getattr(settings, "AUTH_BLACKLIST_REBUILD_INTERVAL", 300)
+
+    def rebuild(self):
+        # Read before the blacklist, so writes racing the query count as
+        # unseen rather than the other way round.
+        self.writes = read_counter(cache, WRITES_KEY)
+        jtis = list(
+            BlacklistedToken.objects.filter(
+                token__expires_at__gt=timezone.now()
+            ).values_list("token__jti", flat=True)
+        )
+        bloom = BloomFilter(
+            max(2 * len(jtis), 1024),
+            getattr(settings, "AUTH_BLACKLIST_ERROR_RATE", 0.01),
+        )
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom, self.built_at = bloom, time.monotonic()
+        metrics.gauge("auth.blacklist.bloom_size", len(jtis))
+
+    def might_contain(self, jti):
+        if self.bloom is None or time.monotonic() - self.built_at > self.interval():
+            with self.lock:
+                if (
+                    self.bloom is None
+                    or time.monotonic() - self.built_at > self.interval()
+                ):
+                    self.rebuild()
+        if jti in self.bloom or cache.get(recent_key(jti)) is not None:
+            return True
+        return not self.is_current()
+
+    def is_current(self):
+        """Whether the filter holds every token blacklisted by any process."""
+        if not is_shared():
+            return False
+        writes = cache.get(WRITES_KEY)
+        return writes is not None and writes == self.writes
+
+    def add(self, jti):
+        if self.bloom is not None:
+            self.bloom.add(jti)
+        cache.set(recent_key(jti), 1, 2 * self.interval())
+        writes = incr_counter(cache, WRITES_KEY)
+        if self.writes is not None and writes == self.writes + 1:
+            # Nobody else wrote since this filter was current.
+            self.writes = writes
+
+    def clear(self):
+        self.bloom = None
+
+
+blacklist_index = BlacklistIndex()
+
+
+class BloomRefreshToken(RefreshToken):
+    """Refresh token that skips the blacklist query for unknown JTIs."""
+
+    def check_blacklist(self):
+        if blacklist_index.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            metrics.incr("auth.blacklist.db_checks")
+            super().check_blacklist()
+        else:
+            metrics.incr("auth.blacklist.db_skipped")
+
+    def blacklist(self):
+        result = super().blacklist()
+        blacklist_index.add(self.payload[api_settings.JTI_CLAIM])
+        return result
+
+
+def estimated_rows(model):
+    """Row count of ``model``'s table, estimated from statistics on Postgres."""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row is not None and row[0] >= 0:
+            return row[0]
+    return model.objects.count()
+
+
+def record_table_sizes():
+    metrics.gauge("auth.outstanding_tokens", estimated_rows(OutstandingToken))
+    metrics.gauge("auth.blacklisted_tokens", estimated_rows(BlacklistedToken))
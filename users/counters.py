@@ -0,0 +1,77 @@
+from collections import Counter
+
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from articles.models import Article
+from users.models import Profile, SubscriptionUser
+
+
+def adjust(user_id, **deltas):
+    """Apply counter deltas to a user's profile in a single UPDATE."""
+    Profile.objects.filter(user_id=user_id).update(
+        **{
+            field: Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        }
+    )
+
+
+def article_created(article):
+    if article.user_id is not None:
+        adjust(article.user_id, num_articles=1)
+
+
+def articles_created(articles):
+    per_author = Counter(article.user_id for article in articles)
+    for user_id, count in per_author.items():
+        if user_id is not None:
+            adjust(user_id, num_articles=count)
+
+
+def article_deleted(article):
+    if article.user_id is not None:
+        adjust(article.user_id, num_articles=-1)
+
+
+def subscription_created(subscription):
+    adjust(subscription.user_id, num_followers=1)
+    adjust(subscription.subscriber_id, num_following=1)
+
+
+def subscription_deleted(subscription):
+    adjust(subscription.user_id, num_followers=-1)
+    adjust(subscription.subscriber_id, num_following=-1)
+
+
+def subscriptions_changed(subscriber_id, user_ids, sign):
+    """Count ``subscriber_id`` following ``user_ids`` in or out, in two UPDATEs."""
+    if not user_ids:
+        return
+    adjust(subscriber_id, num_following=sign * len(user_ids))
+    Profile.objects.filter(user_id__in=user_ids).update(
+        num_followers=Greatest(F("num_followers") + sign, 0)
+    )
+
+
+def actual_counts(user_ids):
+    """Recount articles, followers and following for ``user_ids``."""
+    counts = {
+        user_id: {"num_articles": 0, "num_followers": 0, "num_following": 0}
+        for user_id in user_ids
+    }
+    queries = (
+        ("num_articles", Article.objects, "user"),
+        ("num_followers", SubscriptionUser.objects, "user"),
+        ("num_following", SubscriptionUser.objects, "subscriber"),
+    )
+    for name, manager, field in queries:
+        rows = (
+            manager.filter(**{f"{field}__in": user_ids})
+            .order_by()
+            .values_list(field)
+            .annotate(num=Count("id"))
+        )
+        for user_id, num in rows:
+            counts[user_id][name] = num
+    return counts
@@ -0,0 +1,44 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import (BlacklistedToken,
+                                                             OutstandingToken)
+
+from users.blacklist import record_table_sizes
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted tokens in small batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to pause between batches.",
+        )
+
+    def handle(self, *args, batch_size, sleep, **options):
+        now = timezone.now()
+        deleted = 0
+        while True:
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=now)
+                .order_by("id")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            # One short transaction per batch keeps row locks brief.
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
+            if sleep:
+                time.sleep(sleep)
+
+        record_table_sizes()
+        self.stdout.write(f"deleted {deleted} expired tokens")
@@ -0,0 +1,64 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from users.counters import actual_counts
+from users.models import Profile
+
+FIELDS = ("num_articles", "num_followers", "num_following")
+
+
+class Command(BaseCommand):
+    help = "Recount profile counters in chunks and repair the drifted ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only report drifted counters, do not write them.",
+        )
+
+    def handle(self, *args, chunk_size, verify, **options):
+        checked = drifted = 0
+        last_id = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_id)
+                .order_by("id")
+                .values_list("id", flat=True)[:chunk_size]
+            )
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            checked += len(user_ids)
+            with transaction.atomic():
+                drifted += self.rebuild_chunk(user_ids, verify)
+
+        if verify and drifted:
+            raise CommandError(f"{drifted} of {checked} profiles have drifted")
+        self.stdout.write(f"checked {checked} profiles, repaired {drifted}")
+
+    def rebuild_chunk(self, user_ids, verify):
+        counts = actual_counts(user_ids)
+        profiles = {
+            profile.user_id: profile
+            for profile in Profile.objects.select_for_update().filter(
+                user_id__in=user_ids
+            )
+        }
+        missing, changed = [], []
+        for user_id, actual in counts.items():
+            profile = profiles.get(user_id)
+            if profile is None:
+                missing.append(Profile(user_id=user_id, **actual))
+            elif any(getattr(profile, field) != actual[field] for field in FIELDS):
+                for field in FIELDS:
+                    setattr(profile, field, actual[field])
+                changed.append(profile)
+        for profile in missing + changed:
+            self.stdout.write(f"drift: user {profile.user_id}", self.style.WARNING)
+        if not verify:
+            Profile.objects.bulk_create(missing, ignore_conflicts=True)
+            Profile.objects.bulk_update(changed, FIELDS)
+        return len(missing) + len(changed)
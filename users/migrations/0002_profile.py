@@ -0,0 +1,79 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def create_profiles(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    Article = apps.get_model("articles", "Article")
+    Profile = apps.get_model("users", "Profile")
+    SubscriptionUser = apps.get_model("users", "SubscriptionUser")
+
+    def count(model, field):
+        # One correlated subquery per counter instead of joining them all.
+        rows = (
+            model.objects.filter(**{field: models.OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(num=models.Count("id"))
+            .values("num")
+        )
+        return Coalesce(models.Subquery(rows), 0)
+
+    Profile.objects.bulk_create(
+        (
+            Profile(
+                user_id=user["id"],
+                num_articles=user["num_articles"],
+                num_followers=user["num_followers"],
+                num_following=user["num_following"],
+            )
+            for user in User.objects.annotate(
+                num_articles=count(Article, "user"),
+                num_followers=count(SubscriptionUser, "user"),
+                num_following=count(SubscriptionUser, "subscriber"),
+            )
+            .values("id", "num_articles", "num_followers", "num_following")
+            .iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0001_initial"),
+        ("articles", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Profile",
+            fields=[
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="profile",
+                        serialize=False,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                ("num_articles", models.PositiveIntegerField(default=0)),
+                ("num_followers", models.PositiveIntegerField(default=0)),
+                ("num_following", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(
+                fields=["-num_articles", "user"], name="profile_num_articles"
+            ),
+        ),
+        migrations.RunPython(create_profiles, migrations.RunPython.noop),
+    ]
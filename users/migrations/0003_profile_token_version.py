@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-17 19:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0002_profile"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="token_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_profile_token_version"),
+        ("token_blacklist", "0012_alter_outstandingtoken_user"),
+    ]
+
+    operations = [
+        # Lets prune_tokens find expired tokens without a full table scan.
+        migrations.RunSQL(
+            "CREATE INDEX IF NOT EXISTS token_blacklist_outstanding_expires_idx "
+            "ON token_blacklist_outstandingtoken (expires_at)",
+            "DROP INDEX IF EXISTS token_blacklist_outstanding_expires_idx",
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.1.7 on 2026-10-17 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0004_outstandingtoken_expires_at_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscriptionuser",
+            index=models.Index(
+                fields=["subscriber", "user"], name="subscription_subscriber"
+            ),
+        ),
+    ]
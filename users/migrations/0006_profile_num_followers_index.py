@@ -0,0 +1,16 @@
+# Generated by Django 4.1.7 on 2026-10-17 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0005_subscription_subscriber_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="profile",
+            index=models.Index(fields=["num_followers"], name="profile_num_followers"),
+        ),
+    ]
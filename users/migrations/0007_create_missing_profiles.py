@@ -0,0 +1,56 @@
+# Generated by Django 4.1.7 on 2026-10-17 21:45
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def create_missing_profiles(apps, schema_editor):
+    # Users saved while the profile signal was not installed yet, such as
+    # a superuser created between migrations, or bulk-created rows. The
+    # user list joins profiles with an inner join, so each user needs one.
+    User = apps.get_model("auth", "User")
+    Article = apps.get_model("articles", "Article")
+    Profile = apps.get_model("users", "Profile")
+    SubscriptionUser = apps.get_model("users", "SubscriptionUser")
+
+    def count(model, field):
+        rows = (
+            model.objects.filter(**{field: models.OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(num=models.Count("id"))
+            .values("num")
+        )
+        return Coalesce(models.Subquery(rows), 0)
+
+    Profile.objects.bulk_create(
+        (
+            Profile(
+                user_id=user["id"],
+                num_articles=user["num_articles"],
+                num_followers=user["num_followers"],
+                num_following=user["num_following"],
+            )
+            for user in User.objects.filter(profile__isnull=True)
+            .annotate(
+                num_articles=count(Article, "user"),
+                num_followers=count(SubscriptionUser, "user"),
+                num_following=count(SubscriptionUser, "subscriber"),
+            )
+            .values("id", "num_articles", "num_followers", "num_following")
+            .iterator()
+        ),
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0006_profile_num_followers_index"),
+        ("articles", "0009_feed_ranking"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_profiles, migrations.RunPython.noop),
+    ]
@@ -15,3 +15,27 @@ class SubscriptionUser(models.Model):
                 fields=["user", "subscriber"], name="unique subscriber"
             )
         ]
+        # The unique constraint finds followers; this finds whom a user follows.
+        indexes = [
+            models.Index(fields=["subscriber", "user"], name="subscription_subscriber")
+        ]
+
+
+class Profile(models.Model):
+    """Denormalized per-user counters."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="profile"
+    )
+    num_articles = models.PositiveIntegerField(default=0)
+    num_followers = models.PositiveIntegerField(default=0)
+    num_following = models.PositiveIntegerField(default=0)
+    token_version = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.num_articles} articles"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-num_articles", "user"], name="profile_num_articles"),
+            models.Index(fields=["num_followers"], name="profile_num_followers"),
+        ]
@@ -1,9 +1,14 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
+from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
-from rest_framework.validators import UniqueTogetherValidator
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import (TokenObtainPairSerializer,
+                                                  TokenRefreshSerializer)
+from rest_framework_simplejwt.settings import api_settings
 
+from users.authentication import VERSION_CLAIM, token_version
+from users.blacklist import BloomRefreshToken
 from users.models import SubscriptionUser
 
 
@@ -62,12 +67,47 @@ class UserSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
 
+class VersionedRefreshToken(BloomRefreshToken):
+    """Refresh token that is rejected once the user's tokens were revoked."""
+
+    def verify(self):
+        super().verify()
+        user_id = self[api_settings.USER_ID_CLAIM]
+        if self.get(VERSION_CLAIM, 0) != token_version(user_id):
+            raise TokenError(_("Token has been revoked"))
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = VersionedRefreshToken
+
+
+class UserCompactSerializer(UserSerializer):
+    """User with follower counts instead of the nested subscription lists"""
+    followers_count = serializers.IntegerField(read_only=True)
+    following_count = serializers.IntegerField(read_only=True)
+
+    class Meta(UserSerializer.Meta):
+        fields = (
+            "id",
+            "username",
+            "email",
+            "password",
+            "num_articles",
+            "followers_count",
+            "following_count",
+        )
+
+
 class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
     @classmethod
     def get_token(cls, user):
         token = super().get_token(user)
         token["username"] = user.username
         token["email"] = user.email
+        token["is_staff"] = user.is_staff
+        token["is_superuser"] = user.is_superuser
+        token["is_active"] = user.is_active
+        token[VERSION_CLAIM] = token_version(user.id)
         return token
 
     def create(self, validated_data):
@@ -75,15 +115,18 @@ class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
 
 
 class SubscriptionUserSerializer(serializers.ModelSerializer):
-    subscriber = serializers.CharField(read_only=True,
-                                       default=serializers.CurrentUserDefault()
-                                       )
+    subscriber = serializers.CharField(read_only=True)
 
     class Meta:
         model = SubscriptionUser
         fields = ["user", "subscriber"]
-        validators = [
-            UniqueTogetherValidator(
-                queryset=SubscriptionUser.objects.all(),
-                fields=["user", "subscriber"],
-            )]
+        # Duplicates are rejected by the "unique subscriber" constraint,
+        # see UserFollowingViewSet.perform_create.
+        validators = []
+
+
+class SubscriptionBulkSerializer(serializers.Serializer):
+    users = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=1000
+    )
+    subscribe = serializers.BooleanField(default=True)
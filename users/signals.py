@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from users import counters, subscriptions
+from users.authentication import revoke_tokens
+from users.models import Profile, SubscriptionUser
+
+REVOKING_FIELDS = ("is_active", "is_staff", "is_superuser", "password")
+
+
+@receiver(pre_save, sender=User)
+def user_saving(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(REVOKING_FIELDS):
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*REVOKING_FIELDS).first()
+    instance._revoke_tokens = previous is not None and any(
+        previous[field] != getattr(instance, field) for field in REVOKING_FIELDS
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
+    elif getattr(instance, "_revoke_tokens", False):
+        revoke_tokens(instance.pk)
+
+
+@receiver(post_save, sender="articles.Article")
+def article_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.article_created(instance)
+
+
+@receiver(post_delete, sender="articles.Article")
+def article_deleted(sender, instance, **kwargs):
+    counters.article_deleted(instance)
+
+
+@receiver(post_save, sender=SubscriptionUser)
+def subscription_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.subscription_created(instance)
+
+
+@receiver(post_delete, sender=SubscriptionUser)
+def subscription_deleted(sender, instance, **kwargs):
+    if subscriptions.is_batched():
+        return
+    counters.subscription_deleted(instance)
+    subscriptions.authors_unfollowed([instance.user_id])
@@ -0,0 +1,128 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from articles import feed, outbox, unread
+from users import counters
+from users.models import Profile, SubscriptionUser
+
+
+# Set while a bulk change does the work of the per-row delete signals.
+_batched = ContextVar("batched", default=False)
+
+
+def is_batched():
+    """Whether per-row subscription signals should leave the work to a bulk change."""
+    return _batched.get()
+
+
+@contextmanager
+def batched():
+    token = _batched.set(True)
+    try:
+        yield
+    finally:
+        _batched.reset(token)
+
+
+def _lock_following(subscriber):
+    """Serialize follow changes of one subscriber on its profile row."""
+    list(Profile.objects.select_for_update().filter(user_id=subscriber.id))
+
+
+def _followed(subscriber, user_ids):
+    return set(
+        SubscriptionUser.objects.filter(
+            subscriber_id=subscriber.id, user_id__in=user_ids
+        ).values_list("user_id", flat=True)
+    )
+
+
+def authors_unfollowed(author_ids):
+    """Fan out again to authors that dropped to the fan-out limit."""
+    cooled = feed.cooled_authors(author_ids)
+    if not cooled:
+        return
+    if outbox.enabled():
+        outbox.authors_cooled(cooled)
+    else:
+        feed.backfill_authors(cooled)
+
+
+def subscribe(subscriber, user_ids):
+    """Follow ``user_ids`` with one INSERT that skips existing rows.
+
+    The ``unique subscriber`` constraint rejects duplicates instead of a
+    per-row check. Returns a dict mapping every requested user id to
+    "created", "exists" or "invalid".
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    found = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+    with transaction.atomic():
+        _lock_following(subscriber)
+        existing = _followed(subscriber, found)
+        created = [user_id for user_id in user_ids if user_id in found - existing]
+        SubscriptionUser.objects.bulk_create(
+            [
+                SubscriptionUser(user_id=user_id, subscriber_id=subscriber.id)
+                for user_id in created
+            ],
+            ignore_conflicts=True,
+        )
+        # bulk_create skips the post_save signals, so do their work once.
+        if created:
+            if outbox.enabled():
+                outbox.subscriptions_changed(subscriber.id, created)
+            else:
+                feed.backfill_subscriptions(subscriber.id, created)
+                unread.subscriptions_changed(subscriber, created, 1)
+            counters.subscriptions_changed(subscriber.id, created, 1)
+
+    results = {}
+    for user_id in user_ids:
+        if user_id not in found:
+            results[user_id] = "invalid"
+        elif user_id in existing:
+            results[user_id] = "exists"
+        else:
+            results[user_id] = "created"
+    return results
+
+
+def unsubscribe(subscriber, user_ids):
+    """Unfollow ``user_ids`` with one DELETE.
+
+    Returns a dict mapping every requested user id to "deleted",
+    "not_found" (not followed) or "invalid".
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    found = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+    with transaction.atomic():
+        _lock_following(subscriber)
+        deleted = _followed(subscriber, found)
+        if deleted:
+            if not outbox.enabled():
+                unread.subscriptions_changed(subscriber, deleted, -1)
+            subscriptions = SubscriptionUser.objects.filter(
+                subscriber_id=subscriber.id, user_id__in=deleted
+            )
+            with batched():
+                subscriptions.delete()
+            if outbox.enabled():
+                outbox.subscriptions_changed(subscriber.id, deleted)
+            else:
+                feed.prune_subscriptions(subscriber.id, deleted)
+            counters.subscriptions_changed(subscriber.id, deleted, -1)
+            authors_unfollowed(deleted)
+
+    results = {}
+    for user_id in user_ids:
+        if user_id not in found:
+            results[user_id] = "invalid"
+        elif user_id in deleted:
+            results[user_id] = "deleted"
+        else:
+            results[user_id] = "not_found"
+    return results
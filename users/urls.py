@@ -1,8 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
-from rest_framework_simplejwt.views import TokenRefreshView
 
-from .views import UserFollowingViewSet, UsersViewSet, UserTokenObtainPairView
+from . import async_views
+from .views import (UserFollowingViewSet, UsersViewSet,
+                    UserTokenObtainPairView, UserTokenRefreshView)
 
 router = SimpleRouter()
 
@@ -10,7 +11,12 @@ router.register("profile", UsersViewSet)
 router.register("subscribe", UserFollowingViewSet)
 
 urlpatterns = [
+    path(
+        "async/profile/<str:pk>/",
+        async_views.profile_detail,
+        name="async-user-detail",
+    ),
     path("", include(router.urls)),
     path("login/", UserTokenObtainPairView.as_view()),
-    path("token/refresh/", TokenRefreshView.as_view()),
+    path("token/refresh/", UserTokenRefreshView.as_view(), name="token-refresh"),
 ]
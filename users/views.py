@@ -1,39 +1,187 @@
+import time
+from operator import itemgetter
+
 from django.contrib.auth.models import User
-from django.core.exceptions import ValidationError
-from django.db import IntegrityError
-from django.db.models import Count
-from rest_framework import mixins, status, viewsets
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Q
+from rest_framework import mixins, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.filters import OrderingFilter
-from rest_framework.permissions import (IsAuthenticatedOrReadOnly)
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework.permissions import (IsAuthenticated,
+                                        IsAuthenticatedOrReadOnly)
+from rest_framework.response import Response
+from rest_framework_simplejwt.views import (TokenObtainPairView,
+                                            TokenRefreshView)
+from blog import metrics
+from blog.instrumentation import TimedSerializerMixin
+from blog.routers import ReplicaReadMixin
+from blog.serialization import SparseFieldsetMixin, ValuesListMixin
+from users import subscriptions
+from users.authentication import get_full_user
 from users.models import SubscriptionUser
-from users.serializers import (SubscriptionUserSerializer,
+from users.serializers import (SubscriptionBulkSerializer,
+                               SubscriptionUserSerializer,
+                               UserCompactSerializer,
                                UserSerializer,
-                               UserTokenObtainPairSerializer)
+                               UserTokenObtainPairSerializer,
+                               UserTokenRefreshSerializer)
+
+
+def profile_counter(field):
+    # Every user has a profile (see users/migrations/0007), so this is a
+    # plain column of an inner join.
+    return F(f"profile__{field}")
 
 
-class UsersViewSet(viewsets.ModelViewSet):
-    queryset = User.objects.all().annotate(num_articles=Count("article"))
+class UsersViewSet(
+    ReplicaReadMixin,
+    TimedSerializerMixin,
+    SparseFieldsetMixin,
+    ValuesListMixin,
+    viewsets.ModelViewSet,
+):
+    queryset = User.objects.filter(profile__isnull=False).annotate(
+        num_articles=profile_counter("num_articles")
+    )
     serializer_class = UserSerializer
     filter_backends = [OrderingFilter]
     ordering_fields = ["num_articles"]
+    values_fields = ("id", "username", "email")
+    sparse_columns = {
+        "num_articles": (),
+        "authors": (),
+        "subscribers": (),
+        "followers_count": (),
+        "following_count": (),
+    }
+
+    @property
+    def compact(self):
+        return self.request.query_params.get("compact") in ("1", "true")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.compact:
+            return queryset.annotate(
+                **{
+                    name: profile_counter(field)
+                    for name, field in (
+                        ("followers_count", "num_followers"),
+                        ("following_count", "num_following"),
+                    )
+                    if self.wants_field(name)
+                }
+            )
+        subscriptions = SubscriptionUser.objects.only("id", "user", "subscriber")
+        prefetches = [
+            Prefetch(name, queryset=subscriptions)
+            for name in ("authors", "subscribers")
+            if self.wants_field(name)
+        ]
+        return queryset.prefetch_related(*prefetches)
+
+    def get_serializer_class(self):
+        if self.compact:
+            return UserCompactSerializer
+        return super().get_serializer_class()
+
+    def to_representation_rows(self, rows):
+        """Rows as the user serializers would render them."""
+        getters = {
+            "id": itemgetter("id"),
+            "username": itemgetter("username"),
+            "email": itemgetter("email"),
+            "num_articles": itemgetter("num_articles"),
+        }
+        if self.compact:
+            getters["followers_count"] = itemgetter("followers_count")
+            getters["following_count"] = itemgetter("following_count")
+        elif self.wants_field("authors") or self.wants_field("subscribers"):
+            authors, subscribers = self.subscriptions_of(row["id"] for row in rows)
+            getters["authors"] = lambda row: authors.get(row["id"], [])
+            getters["subscribers"] = lambda row: subscribers.get(row["id"], [])
+        getters = [(name, getters[name]) for name in self.get_fieldset() or getters]
+        return [{name: get(row) for name, get in getters} for row in rows]
+
+    def subscriptions_of(self, user_ids):
+        """Subscriptions of the users as (authors, subscribers) by user id."""
+        user_ids = list(user_ids)
+        authors, subscribers = {}, {}
+        for pk, user_id, subscriber_id in (
+            SubscriptionUser.objects.filter(
+                Q(user_id__in=user_ids) | Q(subscriber_id__in=user_ids)
+            )
+            .order_by("id")
+            .values_list("id", "user_id", "subscriber_id")
+        ):
+            authors.setdefault(user_id, []).append(
+                {"id": pk, "subscriber": subscriber_id}
+            )
+            subscribers.setdefault(subscriber_id, []).append(
+                {"id": pk, "user": user_id}
+            )
+        return authors, subscribers
 
     def get_object(self):
         pk = self.kwargs.get("pk")
         if pk == "current":
-            return self.request.user
+            self.kwargs["pk"] = self.request.user.pk
         return super(UsersViewSet, self).get_object()
 
 
-class UserFollowingViewSet(viewsets.ModelViewSet):
+class UserFollowingViewSet(
+    ReplicaReadMixin, TimedSerializerMixin, viewsets.ModelViewSet
+):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     serializer_class = SubscriptionUserSerializer
-    queryset = SubscriptionUser.objects.all()
+    queryset = SubscriptionUser.objects.select_related("subscriber")
 
     def perform_create(self, serializer):
-        serializer.save(subscriber=self.request.user)
+        try:
+            with transaction.atomic():
+                serializer.save(subscriber=get_full_user(self.request.user))
+        except IntegrityError:
+            raise serializers.ValidationError(
+                {"non_field_errors": ["Already subscribed to this user."]}
+            )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        permission_classes=[IsAuthenticated],
+        serializer_class=SubscriptionBulkSerializer,
+    )
+    def bulk(self, request, *args, **kwargs):
+        """Follow or unfollow up to 1000 users in one request."""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if serializer.validated_data["subscribe"]:
+            change = subscriptions.subscribe
+        else:
+            change = subscriptions.unsubscribe
+        results = change(request.user, serializer.validated_data["users"])
+        return Response(
+            {
+                "results": [
+                    {"user": user_id, "status": result}
+                    for user_id, result in results.items()
+                ]
+            }
+        )
 
 
 class UserTokenObtainPairView(TokenObtainPairView):
     serializer_class = UserTokenObtainPairSerializer
+
+
+class UserTokenRefreshView(TokenRefreshView):
+    serializer_class = UserTokenRefreshSerializer
+
+    def post(self, request, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return super().post(request, *args, **kwargs)
+        finally:
+            metrics.timing(
+                "auth.refresh.latency_ms", (time.perf_counter() - started) * 1000
+            )